@@ -712,19 +712,118 @@ const activeName = _normalizeText(
     return h >>> 0;
   }
 
+  // Packed weights ("p=" / "p:" field): base64 of one int8 per bucket.
+  // Bucket h lives in chars 4*floor(h/3)..+3, so only the buckets a
+  // message hits are decoded.
+  const B64 = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/";
+  function packedLength(p) {
+    return (p.length / 4) * 3 - (p.endsWith("==") ? 2 : (p.endsWith("=") ? 1 : 0));
+  }
+  function packedWeight(p, h) {
+    const i = ((h / 3) | 0) * 4;
+    const n = ((B64.indexOf(p.charAt(i)) & 63) << 18) | ((B64.indexOf(p.charAt(i + 1)) & 63) << 12) |
+      ((B64.indexOf(p.charAt(i + 2)) & 63) << 6) | (B64.indexOf(p.charAt(i + 3)) & 63);
+    const b = (n >> (16 - 8 * (h % 3))) & 255;
+    return b > 127 ? b - 256 : b;
+  }
+
+  // Sparse weights ("d=" / "d:" field): base64 of (gap, int8) pairs for the
+  // non-zero buckets only; gap = bucket - previous bucket (from -1) as a
+  // 7-bit varint. Decoded into a bucket -> weight map; missing buckets are 0.
+  function deltaWeights(d) {
+    const map = {};
+    let bucket = -1, gap = 0, shift = 0, wantWeight = false;
+    for (let i = 0; i < d.length; i += 4) {
+      const n = ((B64.indexOf(d.charAt(i)) & 63) << 18) | ((B64.indexOf(d.charAt(i + 1)) & 63) << 12) |
+        ((B64.indexOf(d.charAt(i + 2)) & 63) << 6) | (B64.indexOf(d.charAt(i + 3)) & 63);
+      const nBytes = d.charAt(i + 2) === "=" ? 1 : (d.charAt(i + 3) === "=" ? 2 : 3);
+      for (let k = 0; k < nBytes; k++) {
+        const b = (n >> (16 - 8 * k)) & 255;
+        if (wantWeight) {
+          map[bucket] = b > 127 ? b - 256 : b;
+          wantWeight = false;
+        } else {
+          gap |= (b & 127) << shift;
+          shift += 7;
+          if (!(b & 128)) {
+            bucket += gap;
+            gap = 0;
+            shift = 0;
+            wantWeight = true;
+          }
+        }
+      }
+    }
+    return map;
+  }
+
+  // 4-bit weights ("q=" / "q:" field): "G,MULTS,CODES[,h:v,...]". CODES is
+  // base64 of one signed nibble per bucket (even bucket in the low nibble),
+  // scaled by the uint8 MULTS[h / G] when G is not 0; "h:v" pairs are
+  // outlier buckets with their exact integer weight. Decoded into an array.
+  function b64Bytes(s) {
+    const out = [];
+    for (let i = 0; i < s.length; i += 4) {
+      const n = ((B64.indexOf(s.charAt(i)) & 63) << 18) | ((B64.indexOf(s.charAt(i + 1)) & 63) << 12) |
+        ((B64.indexOf(s.charAt(i + 2)) & 63) << 6) | (B64.indexOf(s.charAt(i + 3)) & 63);
+      const nBytes = s.charAt(i + 2) === "=" ? 1 : (s.charAt(i + 3) === "=" ? 2 : 3);
+      for (let k = 0; k < nBytes; k++) out.push((n >> (16 - 8 * k)) & 255);
+    }
+    return out;
+  }
+  function quantWeights(q) {
+    const parts = q.split(",");
+    const group = parseInt(parts[0], 10);
+    const mults = group ? b64Bytes(parts[1]) : null;
+    const codes = b64Bytes(parts[2]);
+    const weights = new Array(codes.length * 2);
+    for (let i = 0; i < codes.length; i++) {
+      const lo = codes[i] & 15, hi = codes[i] >> 4;
+      weights[2 * i] = lo > 7 ? lo - 16 : lo;
+      weights[2 * i + 1] = hi > 7 ? hi - 16 : hi;
+    }
+    if (group) {
+      for (let h = 0; h < weights.length; h++) weights[h] *= mults[(h / group) | 0];
+    }
+    for (let k = 3; k < parts.length; k++) {
+      const pair = parts[k].split(":");
+      weights[parseInt(pair[0], 10)] = parseInt(pair[1], 10);
+    }
+    return weights;
+  }
+
+  // Decoded weights per model string (bucket -> weight map for d=, arrays
+  // otherwise; p= is read in place). The script runs once per message, so
+  // they are kept on the global object when the host reuses it between runs.
+  const DECODED_WEIGHTS = typeof globalThis === "object"
+    ? (globalThis.AURA_DECODED_WEIGHTS = globalThis.AURA_DECODED_WEIGHTS || new Map()) : new Map();
+  function decodedWeights(modelStr, kind, wRaw) {
+    let weights = DECODED_WEIGHTS.get(modelStr);
+    if (weights === undefined) {
+      weights = kind === "d" ? deltaWeights(wRaw) : (kind === "q" ? quantWeights(wRaw) : wRaw.split(","));
+      DECODED_WEIGHTS.set(modelStr, weights);
+    }
+    return weights;
+  }
+
   function solveEmotion(textTokens, modelStr) {
     if (!modelStr) return -999;
     const semi1 = modelStr.indexOf(";");
-    const semi2 = modelStr.indexOf(";", semi1 + 1);
+    let semi2 = modelStr.indexOf(";", semi1 + 1);
     const bias = parseFloat(modelStr.slice(2, semi1));
     const scale = parseFloat(modelStr.slice(semi1 + 3, semi2));
+    // optional "c=" field (the C a searched head was trained with): skip it
+    if (modelStr.charAt(semi2 + 1) === "c") semi2 = modelStr.indexOf(";", semi2 + 1);
     const wRaw = modelStr.slice(semi2 + 3);
-    const weights = wRaw.split(",");
+    const kind = modelStr.charAt(semi2 + 1);
+    const weights = kind === "p" ? null : decodedWeights(modelStr, kind, wRaw);
+    const nWeights = kind === "p" ? packedLength(wRaw) : (kind === "d" ? Infinity : weights.length);
     let score = bias;
     for (let i = 0; i < textTokens.length; i++) {
       const h = fnv1a32(textTokens[i]) % 16384;
-      if (h < weights.length) {
-        const w = parseInt(weights[h], 10);
+      if (h < nWeights) {
+        const w = kind === "p" ? packedWeight(wRaw, h) : (kind === "d" ? (weights[h] || 0) :
+          (kind === "q" ? weights[h] : parseInt(weights[h], 10)));
         if (!isNaN(w)) {
           score += w * scale;
         }
@@ -0,0 +1,65 @@
+import importlib
+import sys
+import time
+
+import numpy as np
+from sklearn.metrics import roc_auc_score
+
+from specialist_training import train_specialists
+
+# ==========================================
+# JOINT vs PER-TARGET TRAINING BENCHMARK
+# ==========================================
+# Usage: python bench_joint_training.py [aura|eros|eidos]
+# Builds the creator's balanced training set, holds out HOLDOUT_FRACTION of
+# its rows, and trains the specialists both ways (serial liblinear loop vs
+# one joint L-BFGS pass). Reports wall time and per-target held-out AUC.
+ENGINES = {
+    "aura": ("emotion_creator2", "ALL_TARGETS"),
+    "eros": ("eros_creator", "TARGETS"),
+    "eidos": ("intent_creator", "TARGETS"),
+}
+HOLDOUT_FRACTION = 0.2
+
+
+def holdout_auc(models, X, labels, sample_weight, targets):
+    aucs = {}
+    for target in targets:
+        y = labels == target
+        if y.all() or not y.any():
+            aucs[target] = float("nan")
+            continue
+        coef, intercept = models[target]
+        aucs[target] = roc_auc_score(y, X @ coef + intercept, sample_weight=sample_weight)
+    return aucs
+
+
+def main(engine="aura"):
+    module_name, targets_name = ENGINES[engine]
+    creator = importlib.import_module(module_name)
+    targets = getattr(creator, targets_name)
+
+    df_final, X, sample_weight = creator.build_training_set()
+    labels = df_final['label'].to_numpy(dtype=object)
+    order = np.random.RandomState(0).permutation(len(labels))
+    n_test = int(len(labels) * HOLDOUT_FRACTION)
+    test, train = np.sort(order[:n_test]), np.sort(order[n_test:])
+
+    results = {}
+    for name, joint in [("per-target", False), ("joint", True)]:
+        start = time.perf_counter()
+        models = train_specialists(X[train], labels[train], targets, sample_weight[train],
+                                   creator.TRAIN_PARAMS, n_jobs=1, joint=joint)
+        elapsed = time.perf_counter() - start
+        results[name] = (elapsed, holdout_auc(models, X[test], labels[test], sample_weight[test], targets))
+
+    print(f"\n--- {engine.upper()}: {len(train)} train / {len(test)} held-out rows, {X.shape[1]} features ---")
+    print(f"{'target':<14}{'per-target AUC':>16}{'joint AUC':>12}")
+    for target in targets:
+        print(f"{target:<14}{results['per-target'][1][target]:>16.4f}{results['joint'][1][target]:>12.4f}")
+    for name, (elapsed, aucs) in results.items():
+        print(f"{name:<14} wall {elapsed:8.2f}s   mean AUC {np.nanmean(list(aucs.values())):.4f}")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
@@ -0,0 +1,154 @@
+import importlib
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from reference_scorer import BlobScorer
+from sparse_export_report import model_name
+from specialist_export import WEIGHT_FORMATS
+from specialist_training import train_specialists
+
+# ==========================================
+# SCORING LATENCY / BLOB SIZE BENCHMARK
+# ==========================================
+# Usage: python bench_scoring.py [aura|eros|eidos ...]
+# For every engine, HASH_SIZE in HASH_SIZES and bigrams on / off, builds the
+# creator's training set, trains the specialists and renders the blob in
+# every export format. Each blob is then loaded into the Python reference
+# scorer (reference_scorer.py), which measures:
+#   blob_bytes        size of the exported .js
+#   parse_ms          best-of-PARSE_REPEATS time to parse it into arrays
+#   latency_us        p50 / p90 / p99 of scoring one message at a time
+#   heldout_accuracy  decisions (score > 0) vs the held-out labels, over
+#                     the heads the runtime evaluates
+# Results go to BENCH_REPORT as sorted-key JSON, so two releases diff
+# cleanly. Timings are machine-dependent; sizes and accuracies are not.
+#
+# Builds skip the creators' persisted feature index: it is keyed on the
+# shipped (HASH_SIZE, bigrams) and opening it at another setting would
+# replace it in .creator_cache.
+#
+# The runtime always appends bigrams and AURA's template hard-codes
+# % 16384, so configurations other than the shipped ones are scored as if
+# the template followed the build's HASH_SIZE.
+ENGINES = {
+    "aura": ("emotion_creator2", "ALL_TARGETS"),
+    "eros": ("eros_creator", "TARGETS"),
+    "eidos": ("intent_creator", "TARGETS"),
+}
+HASH_SIZES = [4096, 16384, 65536]
+BIGRAMS = [True, False]
+LATENCY_SAMPLE = 500
+PARSE_REPEATS = 3
+BENCH_REPORT = "bench_report.json"
+
+
+def heldout_texts(creator, targets):
+    # -> (raw held-out messages, {target: bool labels}) one row per message
+    df = creator.load_heldout_corpus()
+    df = df[df['label'].isin(targets)]
+    texts = pd.Index(df['text'].unique())
+    rows = texts.get_indexer(df['text'])
+    labels = {}
+    for target in targets:
+        y = np.zeros(len(texts), dtype=bool)
+        y[rows[df['label'].to_numpy() == target]] = True
+        labels[target] = y
+    return list(texts), labels
+
+
+def configure(creator, hash_size, bigrams):
+    # Point the creator's pipeline at another HASH_SIZE / n-gram setting
+    creator.HASH_SIZE = hash_size
+    creator.VIEW.hash_size = hash_size
+    creator.VIEW.bigrams = bigrams
+
+
+def measure_blob(engine, path, hash_size, texts, labels, head_targets):
+    parse_ms = []
+    for _ in range(PARSE_REPEATS):
+        start = time.perf_counter()
+        scorer = BlobScorer(engine, path, modulus=hash_size)
+        parse_ms.append((time.perf_counter() - start) * 1000)
+
+    step = max(1, len(texts) // LATENCY_SAMPLE)
+    latency = []
+    for text in texts[::step][:LATENCY_SAMPLE]:
+        start = time.perf_counter()
+        scorer.decide([text])
+        latency.append((time.perf_counter() - start) * 1e6)
+
+    scores = scorer.scores(texts)
+    heads = {}
+    for k, name in enumerate(scorer.names):
+        target = head_targets.get(name)
+        if target is not None and scorer.present[k]:
+            heads[name] = float(((scores[:, k] > 0) == labels[target]).mean())
+    p50, p90, p99 = np.percentile(latency, [50, 90, 99])
+    return {
+        "blob_bytes": os.path.getsize(path),
+        "parse_ms": round(min(parse_ms), 3),
+        "latency_us": {"p50": round(p50, 1), "p90": round(p90, 1), "p99": round(p99, 1)},
+        "heldout_accuracy": round(float(np.mean(list(heads.values()))), 6) if heads else None,
+        "heads": {name: round(acc, 6) for name, acc in heads.items()},
+    }
+
+
+def bench_engine(engine):
+    module_name, targets_name = ENGINES[engine]
+    creator = importlib.import_module(module_name)
+    targets = getattr(creator, targets_name)
+    head_targets = {model_name(creator, t): t for t in targets}
+    texts, labels = heldout_texts(creator, targets)
+    shipped = (creator.HASH_SIZE, creator.VIEW.bigrams)
+
+    results = []
+    try:
+        for hash_size in HASH_SIZES:
+            for bigrams in BIGRAMS:
+                configure(creator, hash_size, bigrams)
+                start = time.perf_counter()
+                df_final, X, sample_weight = creator.build_training_set(use_index=False)
+                models = train_specialists(X, df_final['label'].to_numpy(dtype=object), targets,
+                                           sample_weight, creator.TRAIN_PARAMS, n_jobs=creator.N_JOBS)
+                build_s = time.perf_counter() - start
+                with tempfile.TemporaryDirectory() as tmp:
+                    for fmt in WEIGHT_FORMATS:
+                        path = os.path.join(tmp, f"{engine}_{fmt}.js")
+                        with open(path, "w") as f:
+                            f.write(creator.render_blob(models, fmt=fmt))
+                        row = dict(engine=engine, hash_size=hash_size, bigrams=bigrams, format=fmt,
+                                   shipped=(hash_size, bigrams) == shipped,
+                                   train_rows=int(X.shape[0]), build_s=round(build_s, 2),
+                                   heldout_messages=len(texts))
+                        row.update(measure_blob(engine, path, hash_size, texts, labels, head_targets))
+                        results.append(row)
+                        print(f"{engine:<6}{hash_size:>7} bigrams={bigrams!s:<6}{fmt:<7}"
+                              f"{row['blob_bytes']:>10} B  parse {row['parse_ms']:>8.1f} ms  "
+                              f"p50 {row['latency_us']['p50']:>7.1f} us  acc {row['heldout_accuracy']}")
+    finally:
+        configure(creator, *shipped)
+    return results
+
+
+def main(*engines):
+    engines = engines or tuple(ENGINES)
+    results = [row for engine in engines for row in bench_engine(engine)]
+    report = {
+        "hash_sizes": HASH_SIZES,
+        "bigrams": BIGRAMS,
+        "formats": list(WEIGHT_FORMATS),
+        "results": results,
+    }
+    with open(BENCH_REPORT, "w") as f:
+        json.dump(report, f, indent=1, sort_keys=True)
+    print(f"\nWrote {len(results)} results to {BENCH_REPORT}")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
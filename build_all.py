@@ -0,0 +1,39 @@
+import emotion_creator2
+import eros_creator
+import intent_creator
+from heldout_eval import evaluate
+from unified_export import build_unified, write_unified, UNIFIED_BLOB
+
+# ==========================================
+# FULL THREE-ENGINE REBUILD
+# ==========================================
+# Runs the AURA, EROS and EIDOS creators in one process. The source parsers
+# (corpus_loaders) and the chunk -> token table (text_clean) are shared, so
+# GoEmotions and DailyDialogue are parsed and tokenized once for all three
+# engines; each creator only applies its own EngineView (stop words,
+# stemmer, n-grams) on top.
+#
+# With EVALUATE, each engine's fresh models and blob are then scored on its
+# dev / test splits (heldout_eval.py).
+CREATORS = [
+    ("AURA", emotion_creator2),
+    ("EROS", eros_creator),
+    ("EIDOS", intent_creator),
+]
+EVALUATE = False
+
+
+def main():
+    for name, creator in CREATORS:
+        print(f"\n========== {name} ==========")
+        models = creator.main()
+        if EVALUATE:
+            evaluate(name.lower(), creator, models)
+
+    model = build_unified()
+    write_unified(model)
+    print(f"\n{UNIFIED_BLOB}: {len(model.heads)} heads x {model.hash_size} buckets")
+
+
+if __name__ == "__main__":
+    main()
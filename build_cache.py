@@ -0,0 +1,74 @@
+import hashlib
+import inspect
+import os
+import shutil
+
+# ==========================================
+# ON-DISK BUILD CACHE (shared by the creators)
+# ==========================================
+# Every cache entry lives in CACHE_DIR/<kind>/<name>-<key>. The key is a
+# digest of everything the entry was derived from (source file contents,
+# config values, function source), so any change simply misses the cache.
+CACHE_DIR = ".creator_cache"
+
+_FILE_DIGESTS = {}
+
+
+def file_digest(path):
+    # Content hash of a source file, memoized on (size, mtime).
+    try:
+        st = os.stat(path)
+    except OSError:
+        return "missing"
+    memo_key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    if memo_key not in _FILE_DIGESTS:
+        h = hashlib.sha1()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        _FILE_DIGESTS[memo_key] = h.hexdigest()
+    return _FILE_DIGESTS[memo_key]
+
+
+def function_digest(fn):
+    try:
+        src = inspect.getsource(fn)
+    except (OSError, TypeError):
+        src = repr(fn.__code__.co_code) + repr(fn.__code__.co_consts)
+    return hashlib.sha1(src.encode("utf-8")).hexdigest()
+
+
+def config_digest(*parts):
+    # Digest of config values. Sets are sorted, functions hashed by source.
+    h = hashlib.sha1()
+    for part in parts:
+        if callable(part):
+            part = function_digest(part)
+        elif isinstance(part, (set, frozenset)):
+            part = sorted(part)
+        h.update(repr(part).encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def entry_dir(kind, name, key):
+    return os.path.join(CACHE_DIR, kind, f"{name}-{key[:16]}")
+
+
+def prune_stale(kind, name, keep):
+    # Drop older entries of the same kind/name once a new one is written.
+    root = os.path.join(CACHE_DIR, kind)
+    if not os.path.isdir(root):
+        return
+    for entry in os.listdir(root):
+        path = os.path.join(root, entry)
+        if entry.startswith(name + "-") and path != keep:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def publish(tmp_dir, final_dir):
+    # Atomic-ish publish of a fully written entry directory.
+    if os.path.isdir(final_dir):
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        return
+    os.replace(tmp_dir, final_dir)
@@ -0,0 +1,123 @@
+import importlib
+import sys
+
+import numpy as np
+
+from corpus_cache import cached_corpus
+from feature_index import open_feature_index
+from fnv_hash import fnv1a_32_batch
+from sparse_export_report import ENGINES, model_name
+from specialist_export import parse_model, read_blob
+
+# ==========================================
+# HASH COLLISION ANALYZER
+# ==========================================
+# Usage: python collision_report.py [aura|eros|eidos] [blob.js]
+# Opens the engine's feature index (unigrams + bigrams, as the runtime
+# always hashes both) and inverts it into bucket -> contributing features,
+# each with its corpus document frequency. For every specialist in the blob
+# it lists the HEAVY_BUCKETS largest |weight| buckets and flags the ones a
+# frequent feature shares with another frequent feature: the weight learned
+# for one of them is applied to both at runtime.
+#
+# A bucket is "contested" when its second most frequent feature appears in
+# at least MIN_COLLISION_DF documents and carries at least COLLISION_SHARE
+# of the bucket's total document frequency.
+#
+# The closing table re-buckets every feature with at least MIN_COLLISION_DF
+# documents at other HASH_SIZEs and reports the share of the COMPARE_TOP
+# most frequent ones that land in a contested bucket, to tell whether a
+# rebuild at another size would pay off.
+HEAVY_BUCKETS = 15
+MIN_COLLISION_DF = 20
+COLLISION_SHARE = 0.2
+SHOW_FEATURES = 4
+COMPARE_TOP = 5000
+COMPARE_SIZES = [4096, 8192, 16384, 32768, 65536, 131072]
+
+
+def open_index(creator):
+    # EROS / EIDOS train on unigrams, so their creators index a different key:
+    # build this one next to theirs without pruning them (AURA shares its own)
+    df = cached_corpus(creator.VIEW.name, creator.SOURCES, config=creator.CORPUS_CONFIG,
+                       build=creator.load_real_corpus)
+    return open_feature_index(creator.VIEW.name, df['clean_text'], sources=creator.SOURCES,
+                              hash_size=creator.HASH_SIZE, bigrams=True,
+                              config=(creator.stem, creator.STOP_WORDS, creator.advanced_clean),
+                              prune=creator.VIEW.bigrams)
+
+
+def bucket_members(index, order, starts, bucket):
+    # -> [(feature, doc_freq)] of one bucket, most frequent first
+    pos = order[starts[bucket]:starts[bucket + 1]]
+    members = [(index.features[p].decode("utf-8"), int(index.doc_freq[p])) for p in pos]
+    return sorted(members, key=lambda m: -m[1])
+
+
+def contested(members):
+    if len(members) < 2:
+        return False
+    total = sum(df for _, df in members)
+    runner_up = members[1][1]
+    return runner_up >= MIN_COLLISION_DF and runner_up >= COLLISION_SHARE * total
+
+
+def contested_share(features, doc_freq, hash_size, n_top):
+    # share of the first n_top features (most frequent first) that sit in a
+    # contested bucket at hash_size
+    buckets = (fnv1a_32_batch(features) % np.uint32(hash_size)).astype(np.int64)
+    order = np.lexsort((-doc_freq, buckets))
+    b, df = buckets[order], doc_freq[order]
+    first = np.r_[True, b[1:] != b[:-1]]
+    starts = np.flatnonzero(first)
+    totals = np.add.reduceat(df, starts)
+    has_second = np.r_[starts[1:] - starts[:-1] > 1, len(b) - starts[-1] > 1]
+    second = np.where(has_second, df[np.minimum(starts + 1, len(df) - 1)], 0)
+    hot = (second >= MIN_COLLISION_DF) & (second >= COLLISION_SHARE * totals)
+    feature_hot = np.empty(len(b), dtype=bool)
+    feature_hot[order] = hot[np.cumsum(first) - 1]
+    return float(feature_hot[:n_top].mean())
+
+
+def main(engine="aura", blob=None):
+    module_name, targets_name, default_blob = ENGINES[engine]
+    creator = importlib.import_module(module_name)
+    targets = getattr(creator, targets_name)
+    index = open_index(creator)
+    order, starts = index.by_bucket()
+    models = read_blob(blob or default_blob)
+
+    occupied = np.diff(starts) > 0
+    print(f"\n--- {engine.upper()}: {len(index)} features from {index.n_docs} documents "
+          f"in {index.hash_size} buckets ({occupied.mean():.1%} occupied, "
+          f"{len(index) / max(occupied.sum(), 1):.1f} features per used bucket) ---")
+
+    for target in targets:
+        name = model_name(creator, target)
+        if name not in models:
+            continue
+        bias, scale, w = parse_model(models[name], size=creator.HASH_SIZE)
+        heavy = np.argsort(-np.abs(w), kind="stable")[:HEAVY_BUCKETS]
+        rows = [(b, bucket_members(index, order, starts, b)) for b in heavy if b < index.hash_size]
+        hot = [(b, m) for b, m in rows if contested(m)]
+        mass = np.abs(w[heavy]).sum() or 1
+        hot_mass = sum(abs(int(w[b])) for b, _ in hot) / mass
+        print(f"\n[{name}] {len(hot)}/{len(rows)} heavy buckets contested ({hot_mass:.0%} of their weight)")
+        for b, members in hot:
+            shown = ", ".join(f"{t!r}:{df}" for t, df in members[:SHOW_FEATURES])
+            more = f" (+{len(members) - SHOW_FEATURES})" if len(members) > SHOW_FEATURES else ""
+            print(f"  bucket {b:>6} w={int(w[b]):>4}  {shown}{more}")
+
+    doc_freq = np.asarray(index.doc_freq)
+    top = np.argsort(-doc_freq, kind="stable")
+    top = top[doc_freq[top] >= MIN_COLLISION_DF]
+    features = [index.features[p].decode("utf-8") for p in top]
+    n_top = min(COMPARE_TOP, len(features))
+    print(f"\nTop {n_top} features in a contested bucket, by HASH_SIZE:")
+    for size in COMPARE_SIZES:
+        mark = "  <- current" if size == index.hash_size else ""
+        print(f"  {size:>7}  {contested_share(features, doc_freq[top], size, n_top):6.2%}{mark}")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
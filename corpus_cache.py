@@ -0,0 +1,77 @@
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+import corpus_loaders
+import text_clean
+from build_cache import config_digest, entry_dir, file_digest, prune_stale, publish
+
+# ==========================================
+# CONTENT-ADDRESSED CORPUS CACHE
+# ==========================================
+# Stores the cleaned (clean_text, label, source) table of a creator's real
+# corpora as raw .npy columns:
+#   text columns        -> one utf-8 byte blob + int64 end offsets
+#   categorical columns -> int codes + categories in meta.json
+# The key hashes the source files, corpus_loaders.py and the cleaning
+# config, so only a change to one of those re-parses the corpus.
+CORPUS_CACHE_VERSION = 1
+TEXT_COLUMNS = ["clean_text"]
+CATEGORICAL_COLUMNS = ["label", "source"]
+
+
+def write_table(path, df):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=os.path.dirname(path))
+    meta = {"n_rows": len(df), "categories": {}}
+    for col in TEXT_COLUMNS:
+        encoded = [s.encode("utf-8") for s in df[col]]
+        ends = np.cumsum([len(b) for b in encoded], dtype=np.int64)
+        np.save(os.path.join(tmp, f"{col}.blob.npy"), np.frombuffer(b"".join(encoded), dtype=np.uint8))
+        np.save(os.path.join(tmp, f"{col}.ends.npy"), ends)
+    for col in CATEGORICAL_COLUMNS:
+        cat = pd.Categorical(df[col])
+        np.save(os.path.join(tmp, f"{col}.codes.npy"), cat.codes)
+        meta["categories"][col] = [str(c) for c in cat.categories]
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump(meta, f)
+    publish(tmp, path)
+
+
+def read_table(path):
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    cols = {}
+    for col in TEXT_COLUMNS:
+        blob = np.load(os.path.join(path, f"{col}.blob.npy")).tobytes()
+        ends = np.load(os.path.join(path, f"{col}.ends.npy")).tolist()
+        starts = [0] + ends[:-1]
+        cols[col] = np.array([blob[a:b].decode("utf-8") for a, b in zip(starts, ends)], dtype=object)
+    for col in CATEGORICAL_COLUMNS:
+        codes = np.load(os.path.join(path, f"{col}.codes.npy"))
+        cols[col] = pd.Categorical.from_codes(codes, meta["categories"][col])
+    return pd.DataFrame(cols)
+
+
+def cached_corpus(name, sources, config, build):
+    """Return build()'s cleaned table, reusing the cached copy when valid.
+
+    `config` lists everything that shapes the table besides the source
+    files: stem, STOP_WORDS, advanced_clean, the label maps, ... The
+    source of `build` itself is part of the key as well.
+    """
+    key = config_digest(CORPUS_CACHE_VERSION, [file_digest(p) for p in sources],
+                        file_digest(corpus_loaders.__file__), file_digest(text_clean.__file__),
+                        build, *config)
+    path = entry_dir("corpus", name, key)
+    if os.path.isfile(os.path.join(path, "meta.json")):
+        df = read_table(path)
+        print(f"[CACHE] Reusing {len(df)} cleaned rows for {name}")
+        return df
+    df = build()[TEXT_COLUMNS + CATEGORICAL_COLUMNS].reset_index(drop=True)
+    write_table(path, df)
+    prune_stale("corpus", name, keep=path)
+    return df
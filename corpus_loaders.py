@@ -0,0 +1,224 @@
+import functools
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from build_cache import file_digest
+
+# ==========================================
+# COLUMNAR DATASET LOADERS
+# ==========================================
+# Every loader returns a DataFrame with columns:
+#   text   - raw text (object array)
+#   label  - categorical label (label.cat.codes is the contiguous code array)
+#   source - name of the corpus the row came from
+# Label mappings (MAP_GO_EMOTION, DD_MAP, ...) are applied as vectorized
+# lookups; a row whose key maps to several labels yields one row per label.
+#
+# The read_* parsers are memoized per process on (path, file contents), so
+# when several creators run in one process (build_all.py) each source file
+# is parsed once. Their results are shared: treat them as read-only.
+#
+# The iter_* variants yield the same rows a chunk of the file at a time, so
+# a caller holds one chunk in memory whatever the file size (streaming
+# training). They are not memoized.
+
+
+def parsed_once(reader):
+    memo = {}
+
+    @functools.wraps(reader)
+    def wrapper(path, *args):
+        key = (path, file_digest(path)) + args
+        if key not in memo:
+            memo[key] = reader(path, *args)
+        return memo[key]
+    return wrapper
+
+
+def labeled(text, label, source):
+    text = np.asarray(text, dtype=object)
+    return pd.DataFrame({
+        "text": text,
+        "label": pd.Categorical(np.asarray(label, dtype=object)),
+        "source": source,
+    })
+
+
+def map_labels(text, keys, mapping, source):
+    # Keep the rows whose key is in `mapping`, relabelled through it.
+    text = pd.Series(text, copy=False).reset_index(drop=True)
+    mapped = pd.Series(keys, copy=False).reset_index(drop=True).map(mapping)
+    keep = mapped.notna().to_numpy()
+    return labeled(text[keep], mapped[keep], source)
+
+
+def concat_labeled(frames):
+    frames = [f for f in frames if len(f)]
+    if not frames:
+        return labeled([], [], "")[:0]
+    df = pd.concat(frames, ignore_index=True)
+    df["label"] = df["label"].astype("category")
+    return df
+
+
+# --- ISEAR: ID,sentiment,content ---
+@parsed_once
+def read_isear(path):
+    df = pd.read_csv(path, usecols=["sentiment", "content"])
+    return df["content"], df["sentiment"]
+
+
+def load_isear(path, mappings, source="isear"):
+    text, sentiment = read_isear(path)
+    return concat_labeled([map_labels(text, sentiment, m, source) for m in mappings])
+
+
+def iter_isear(path, mappings, chunk_rows, source="isear"):
+    for df in pd.read_csv(path, usecols=["sentiment", "content"], chunksize=chunk_rows):
+        yield concat_labeled([map_labels(df["content"], df["sentiment"], m, source) for m in mappings])
+
+
+# --- GoEmotions: text <TAB> "i,j,k" <TAB> id (no header) ---
+GOEMOTIONS_CSV = dict(sep="\t", header=None, usecols=[0, 1], names=["text", "ids"],
+                      dtype=str, keep_default_na=False)
+
+
+def goemotions_rows(df):
+    # Drop a header row / malformed rows (the id column must be "i,j,...")
+    df = df[df["ids"].fillna("").str.fullmatch(r"\d+(,\d+)*")]
+    ids = df["ids"].str.split(",").explode()
+    return df["text"].loc[ids.index], ids.astype(np.int64)
+
+
+@parsed_once
+def read_goemotions(path):
+    return goemotions_rows(pd.read_csv(path, **GOEMOTIONS_CSV))
+
+
+def load_goemotions(path, mappings, source="goemotions"):
+    text, ids = read_goemotions(path)
+    return concat_labeled([map_labels(text, ids, m, source) for m in mappings])
+
+
+def iter_goemotions(path, mappings, chunk_rows, source="goemotions"):
+    for df in pd.read_csv(path, chunksize=chunk_rows, **GOEMOTIONS_CSV):
+        text, ids = goemotions_rows(df)
+        yield concat_labeled([map_labels(text, ids, m, source) for m in mappings])
+
+
+# --- SST-2: sentence <TAB> label (with header) ---
+@parsed_once
+def read_sst2(path):
+    return pd.read_csv(path, sep="\t")
+
+
+def sst2_rows(df, source="sst2"):
+    label = np.where(df["label"].to_numpy() == 1, "positive", "negative")
+    return labeled(df["sentence"], label, source)
+
+
+def load_sst2(path, source="sst2"):
+    return sst2_rows(read_sst2(path), source)
+
+
+def iter_sst2(path, chunk_rows, source="sst2"):
+    for df in pd.read_csv(path, sep="\t", chunksize=chunk_rows):
+        yield sst2_rows(df, source)
+
+
+# --- DailyDialogue: one dialogue per line, "__eou__"-separated turns ---
+@parsed_once
+def read_dialogue_lines(path, sep):
+    # One list per line: turns (sep="__eou__") or act / emotion codes (" ").
+    with open(path, "r", encoding="utf-8") as f:
+        return pd.Series(f.readlines()).str.strip().str.split(sep)
+
+
+def read_daily_dialogue(txt_path, act_path, emo_path=None):
+    """One row per utterance: raw turn text plus its act / emotion code.
+
+    Turns are paired with codes like zip(), i.e. truncated to the shorter
+    of the two lists on each line.
+    """
+    code_paths = [act_path] + ([emo_path] if emo_path else [])
+    columns = [read_dialogue_lines(txt_path, "__eou__")] + [read_dialogue_lines(p, " ") for p in code_paths]
+    return pair_turns(columns)
+
+
+def iter_daily_dialogue(txt_path, act_path, emo_path=None, chunk_lines=5000):
+    # read_daily_dialogue() over chunk_lines dialogues at a time
+    paths = [txt_path, act_path] + ([emo_path] if emo_path else [])
+    seps = ["__eou__"] + [" "] * (len(paths) - 1)
+    files = [open(p, "r", encoding="utf-8") for p in paths]
+    try:
+        while True:
+            lines = [list(itertools.islice(f, chunk_lines)) for f in files]
+            if not min(map(len, lines)):
+                return
+            yield pair_turns([pd.Series(l).str.strip().str.split(sep) for l, sep in zip(lines, seps)])
+    finally:
+        for f in files:
+            f.close()
+
+
+def pair_turns(columns):
+    # [turn lists, act code lists(, emotion code lists)] -> one row per utterance
+    n_lines = min(len(c) for c in columns)
+
+    parts_t = columns[0][:n_lines]
+    parts_c = [c[:n_lines] for c in columns[1:]]
+    n_turns = np.minimum.reduce([p.str.len().to_numpy() for p in [parts_t] + parts_c])
+
+    def flat(parts):
+        return np.array([x for p, n in zip(parts, n_turns) for x in p[:n]], dtype=object)
+
+    out = pd.DataFrame({"text": flat(parts_t), "act": flat(parts_c[0])})
+    if len(parts_c) > 1:
+        out["emotion"] = flat(parts_c[1])
+    return out
+
+
+def load_daily_dialogue(txt_path, act_path, act_map, min_len=0, source="dailydialog"):
+    dd = read_daily_dialogue(txt_path, act_path)
+    dd = dd[dd["text"].str.len() > min_len]
+    return map_labels(dd["text"], dd["act"], act_map, source)
+
+
+def iter_daily_dialogue_acts(txt_path, act_path, act_map, chunk_lines, min_len=0, source="dailydialog"):
+    for dd in iter_daily_dialogue(txt_path, act_path, chunk_lines=chunk_lines):
+        dd = dd[dd["text"].str.len() > min_len]
+        yield map_labels(dd["text"], dd["act"], act_map, source)
+
+
+# --- PersonaChat: personality.csv, '.'-separated persona sentences ---
+@parsed_once
+def read_persona_chat(path):
+    return pd.read_csv(path, usecols=["Persona"])
+
+
+def persona_rows(df, label, min_len=5, source="personachat"):
+    sentences = df["Persona"].astype(str).str.split(".").explode()
+    sentences = sentences[sentences.str.len() > min_len]
+    return labeled(sentences, np.full(len(sentences), label, dtype=object), source)
+
+
+def load_persona_chat(path, label, min_len=5, source="personachat"):
+    return persona_rows(read_persona_chat(path), label, min_len, source)
+
+
+def iter_persona_chat(path, label, chunk_rows, min_len=5, source="personachat"):
+    for df in pd.read_csv(path, usecols=["Persona"], chunksize=chunk_rows):
+        yield persona_rows(df, label, min_len, source)
+
+
+# --- SYNTHETICS dict: {label: [phrase, ...]} ---
+def load_synthetics(synthetics, keep=None, weight=1.0, source="synthetic"):
+    # `keep(phrase)` filters phrases (e.g. those that clean to nothing).
+    # Each kept phrase appears once, with `weight` standing in for copies.
+    pairs = [(p, label) for label, phrases in synthetics.items() for p in phrases
+             if keep is None or keep(p)]
+    df = labeled([p for p, _ in pairs], [label for _, label in pairs], source)
+    df["weight"] = float(weight)
+    return df
@@ -1,10 +1,15 @@
 import pandas as pd
 import numpy as np
-import re
-import csv
-from sklearn.linear_model import LogisticRegression
-from sklearn.utils import resample
-from sklearn.feature_extraction.text import TfidfTransformer
+import os
+from featurize import EngineView
+from specialist_export import c_field, quant_field, weights_field
+from feature_index import open_feature_index
+from corpus_cache import cached_corpus
+from build_cache import config_digest, file_digest
+from specialist_training import balance_classes, search_c, update_specialists, weighted_tfidf
+from streaming_training import STREAM_CHUNK_ROWS, train_streaming
+from corpus_loaders import (concat_labeled, iter_daily_dialogue_acts, iter_goemotions, iter_isear, iter_sst2,
+                            load_daily_dialogue, load_goemotions, load_isear, load_sst2, load_synthetics)
 
 # ==========================================
 # CONFIGURATION
@@ -19,7 +24,21 @@ ALL_TARGETS = TARGET_EMOTIONS + BINARY_TARGETS
 
 HASH_SIZE = 16384 
 SAMPLES_PER_CLASS = 3000
-SYNTHETIC_AMPLIFICATION = 100 
+SYNTHETIC_AMPLIFICATION = 100 # sample weight of each synthetic phrase
+N_JOBS = os.cpu_count() or 1 # parallel specialist fits
+JOINT_TRAINING = False # True: all specialists in one L-BFGS pass
+INCREMENTAL = False # True: retrain only targets whose SYNTHETICS changed (warm start)
+WEIGHT_FORMAT = "csv" # "csv" (w=), "packed" base64 int8 (p=) or "sparse" non-zero buckets (d=)
+SPARSE_THRESHOLD = 0 # sparse export drops buckets with |int8 weight| <= this
+QUANTIZER = "int8" # "int8", or 4-bit "int4" / "group" / "mixed" (q=, ignores WEIGHT_FORMAT)
+TRAIN_PARAMS = dict(solver='liblinear', penalty='l2', C=1.0, class_weight='balanced')
+C_SEARCH = False # True: pick C per target by CV over C_PATH before training
+C_PATH = [0.01, 0.03, 0.1, 0.3, 1.0, 3.0]
+CV_FOLDS = 3
+SPARSE_BUDGET = None # int: L1 specialists with at most this many non-zero buckets each (exported sparse)
+SPARSE_PARAMS = dict(solver='liblinear', penalty='l1', class_weight='balanced') # or solver='saga', penalty='elasticnet', l1_ratio=0.5
+STREAMING = False # True: SGD epochs over the chunked sources in bounded memory (streaming_training.py)
+STREAM_EPOCHS = 5
 
 # ==========================================
 # 1. SUPER DICTIONARY (Synthetics)
@@ -203,12 +222,12 @@ def stem(w):
 
 STOP_WORDS = set(["i", "me", "my", "myself", "we", "our", "ours", "ourselves", "you", "your", "yours", "yourself", "yourselves", "he", "him", "his", "himself", "she", "her", "hers", "herself", "it", "its", "itself", "they", "them", "their", "theirs", "themselves", "what", "which", "who", "whom", "this", "that", "these", "those", "am", "is", "are", "was", "were", "be", "been", "being", "have", "has", "had", "having", "do", "does", "did", "doing", "a", "an", "the", "and", "but", "if", "or", "because", "as", "until", "while", "of", "at", "by", "for", "with", "about", "against", "between", "into", "through", "during", "before", "after", "above", "below", "to", "from", "up", "down", "in", "out", "on", "off", "over", "under", "again", "further", "then", "once", "here", "there", "when", "where", "why", "how", "all", "any", "both", "each", "few", "more", "most", "other", "some", "such", "no", "nor", "not", "only", "own", "same", "so", "than", "too", "very", "s", "t", "can", "will", "just", "don", "should", "now"])
 
+# lower -> drop [^a-z0-9\s] -> drop stop words / len <= 2 -> stem, memoized per token;
+# unigrams + bigrams hashed into HASH_SIZE buckets
+VIEW = EngineView("aura", stem, STOP_WORDS, HASH_SIZE, bigrams=True)
+
 def advanced_clean(text):
-    text = str(text).lower()
-    text = re.sub(r'[^a-z0-9\s]', '', text)
-    tokens = text.split()
-    tokens = [stem(t) for t in tokens if t not in STOP_WORDS and len(t) > 2]
-    return " ".join(tokens)
+    return VIEW.cleaner.clean(text)
 
 # PATHS
 PATH_ISEAR = "data/ISEAR/eng_dataset.csv"
@@ -216,6 +235,14 @@ PATH_GO = "data/GoEmotions/train.tsv"
 PATH_SST = "data/SST-2/train.tsv"
 PATH_DAILY_DIAL_TXT = "data/DailyDialogue/dialogues_train.txt"
 PATH_DAILY_DIAL_ACT = "data/DailyDialogue/dialogues_act_train.txt"
+# Held-out splits (never trained on)
+PATH_GO_DEV = "data/GoEmotions/dev.tsv"
+PATH_SST_DEV = "data/SST-2/dev.tsv"
+PATH_DAILY_DIAL_TXT_DEV = "data/DailyDialogue/dialogues_validation.txt"
+PATH_DAILY_DIAL_ACT_DEV = "data/DailyDialogue/dialogues_act_validation.txt"
+PATH_GO_TEST = "data/GoEmotions/test.tsv" # SST-2 test.tsv is unlabelled
+PATH_DAILY_DIAL_TXT_TEST = "data/DailyDialogue/dialogues_test.txt"
+PATH_DAILY_DIAL_ACT_TEST = "data/DailyDialogue/dialogues_act_test.txt"
 
 # MAPPINGS
 # GoEmotions (0-27)
@@ -246,172 +273,207 @@ MAP_GO_SENTIMENT = {
     14:"negative", 16:"negative", 19:"negative", 24:"negative", 25:"negative"
 }
 
-data_pool = []
-print("\n--- LOADING DATASETS ---")
-
-# 1. LOAD ISEAR (With Explicit Counters)
-try:
-    df = pd.read_csv(PATH_ISEAR)
-    count = 0
-    for _,r in df.iterrows():
-        # Load Main 6
-        if r['sentiment'] in TARGET_EMOTIONS: 
-            data_pool.append({'text':r['content'],'label':r['sentiment']})
-            count += 1
-        # Load Sentiment (Recycle)
-        if r['sentiment'] in ["joy", "romance"]:
-            data_pool.append({'text':r['content'],'label':"positive"})
-        if r['sentiment'] in ["anger", "sadness", "fear", "disgust"]:
-            data_pool.append({'text':r['content'],'label':"negative"})
-    print(f"[SUCCESS] Loaded {count} rows from ISEAR")
-except Exception as e:
-    print(f"[FAILED] ISEAR: {e}")
-
-# 2. LOAD GOEMOTIONS (With Explicit Counters & Header Check)
-try:
-    count_emo = 0
-    count_epi = 0
-    with open(PATH_GO,'r',encoding='utf-8') as f:
-        reader=csv.reader(f,delimiter='\t')
-        for r in reader:
-            if len(r) > 1:
-                # Skip header if present (check if column 1 is numeric)
-                if not r[1][0].isdigit(): continue 
-                
-                indices = [int(x) for x in r[1].split(',')]
-                
-                for idx in indices:
-                    # Load Emotions
-                    if idx in MAP_GO_EMOTION:
-                        data_pool.append({'text':r[0], 'label':MAP_GO_EMOTION[idx]})
-                        count_emo += 1
-                    # Load Epistemic
-                    if idx in MAP_GO_EPISTEMIC:
-                        data_pool.append({'text':r[0], 'label':MAP_GO_EPISTEMIC[idx]})
-                        count_epi += 1
-                    # Load Sentiment
-                    if idx in MAP_GO_SENTIMENT:
-                        data_pool.append({'text':r[0], 'label':MAP_GO_SENTIMENT[idx]})
-
-    print(f"[SUCCESS] Loaded {count_emo} Emotions and {count_epi} Cognitive States from GoEmotions")
-except Exception as e:
-    print(f"[FAILED] GoEmotions: {e}")
-
-# 3. LOAD SST-2 (Sentiment Only)
-try:
-    df_sst = pd.read_csv(PATH_SST, sep='\t')
-    count_sst = 0
-    for _, r in df_sst.iterrows():
-        lbl = "positive" if r['label'] == 1 else "negative"
-        data_pool.append({'text': r['sentence'], 'label': lbl})
-        count_sst += 1
-    print(f"[SUCCESS] Loaded {count_sst} rows from SST-2")
-except Exception as e:
-    print(f"[FAILED] SST-2: {e}")
-
-# 4. LOAD DAILY DIALOGUE (Acts)
-try:
-    count_dd = 0
-    with open(PATH_DAILY_DIAL_TXT, 'r', encoding='utf-8') as ft, open(PATH_DAILY_DIAL_ACT, 'r', encoding='utf-8') as fa:
-        lines_txt = ft.readlines()
-        lines_act = fa.readlines()
-        DD_MAP = { '1': 'statement', '2': 'question', '3': 'command', '4': 'agree' }
-        
-        for t_line, a_line in zip(lines_txt, lines_act):
-            parts_t = t_line.strip().split('__eou__')
-            parts_a = a_line.strip().split(' ')
-            for t, a in zip(parts_t, parts_a):
-                if a in DD_MAP and len(t) > 5:
-                    data_pool.append({'text': t, 'label': DD_MAP[a]})
-                    count_dd += 1
-    print(f"[SUCCESS] Loaded {count_dd} rows from DailyDialogue")
-except Exception as e:
-    print(f"[FAILED] DailyDialogue: {e}")
+# ISEAR sentiment column -> labels (Main 6 + Sentiment recycling)
+MAP_ISEAR_EMOTION = {emo: emo for emo in TARGET_EMOTIONS}
+MAP_ISEAR_SENTIMENT = {
+    "joy":"positive", "romance":"positive",
+    "anger":"negative", "sadness":"negative", "fear":"negative", "disgust":"negative"
+}
 
+# DailyDialogue acts
+DD_MAP = { '1': 'statement', '2': 'question', '3': 'command', '4': 'agree' }
 
-# ==========================================
-# 3. INJECTION & BALANCING
-# ==========================================
-df_raw = pd.DataFrame(data_pool)
-if len(df_raw) == 0:
-    print("CRITICAL ERROR: No data loaded from files. Checking Synthetics only.")
-else:
-    df_raw['clean_text'] = df_raw['text'].apply(advanced_clean)
-    df_raw = df_raw[df_raw['clean_text'].str.len() > 0]
-
-print("\n--- Injecting Synthetics ---")
-synth_data = []
-for emo, phrases in SYNTHETICS.items():
-    for phrase in phrases:
-        clean_phrase = advanced_clean(phrase)
-        if len(clean_phrase) > 0:
-            for _ in range(SYNTHETIC_AMPLIFICATION):
-                synth_data.append({'clean_text': clean_phrase, 'label': emo})
-
-df_synth = pd.DataFrame(synth_data)
-df_combined = pd.concat([df_raw, df_synth])
-
-# 4. BALANCE
-balanced_chunks = []
-print(f"Balancing...")
-for target in ALL_TARGETS:
-    df_class = df_combined[df_combined['label'] == target]
-    if len(df_class) > 0:
-        df_resampled = resample(df_class, replace=True, n_samples=SAMPLES_PER_CLASS, random_state=42)
-        balanced_chunks.append(df_resampled)
+SOURCES = [PATH_ISEAR, PATH_GO, PATH_SST, PATH_DAILY_DIAL_TXT, PATH_DAILY_DIAL_ACT]
+# Everything besides SOURCES that shapes the cleaned corpus
+CORPUS_CONFIG = (stem, STOP_WORDS, advanced_clean, MAP_ISEAR_EMOTION, MAP_ISEAR_SENTIMENT,
+                 MAP_GO_EMOTION, MAP_GO_EPISTEMIC, MAP_GO_SENTIMENT, DD_MAP)
+
+def load_real_corpus(isear=PATH_ISEAR, go=PATH_GO, sst=PATH_SST,
+                     dd_txt=PATH_DAILY_DIAL_TXT, dd_act=PATH_DAILY_DIAL_ACT):
+    frames = []
+
+    # 1. LOAD ISEAR (With Explicit Counters)
+    try:
+        if isear:
+            df = load_isear(isear, [MAP_ISEAR_EMOTION, MAP_ISEAR_SENTIMENT])
+            frames.append(df)
+            count = int(df['label'].isin(TARGET_EMOTIONS).sum())
+            print(f"[SUCCESS] Loaded {count} rows from ISEAR")
+    except Exception as e:
+        print(f"[FAILED] ISEAR: {e}")
+
+    # 2. LOAD GOEMOTIONS (With Explicit Counters & Header Check)
+    try:
+        df = load_goemotions(go, [MAP_GO_EMOTION, MAP_GO_EPISTEMIC, MAP_GO_SENTIMENT])
+        frames.append(df)
+        count_emo = int(df['label'].isin(MAP_GO_EMOTION.values()).sum())
+        count_epi = int(df['label'].isin(MAP_GO_EPISTEMIC.values()).sum())
+        print(f"[SUCCESS] Loaded {count_emo} Emotions and {count_epi} Cognitive States from GoEmotions")
+    except Exception as e:
+        print(f"[FAILED] GoEmotions: {e}")
+
+    # 3. LOAD SST-2 (Sentiment Only)
+    try:
+        if sst:
+            df_sst = load_sst2(sst)
+            frames.append(df_sst)
+            print(f"[SUCCESS] Loaded {len(df_sst)} rows from SST-2")
+    except Exception as e:
+        print(f"[FAILED] SST-2: {e}")
+
+    # 4. LOAD DAILY DIALOGUE (Acts)
+    try:
+        df_dd = load_daily_dialogue(dd_txt, dd_act, DD_MAP, min_len=5)
+        frames.append(df_dd)
+        print(f"[SUCCESS] Loaded {len(df_dd)} rows from DailyDialogue")
+    except Exception as e:
+        print(f"[FAILED] DailyDialogue: {e}")
+
+    df_raw = concat_labeled(frames)
+    df_raw['clean_text'] = VIEW.clean(df_raw['text'], n_jobs=N_JOBS)
+    return df_raw[df_raw['clean_text'].str.len() > 0]
+
+def load_heldout_corpus(split="dev"):
+    # Same labelling on the dev / validation or test splits (ISEAR has none)
+    if split == "test":
+        return load_real_corpus(isear=None, go=PATH_GO_TEST, sst=None,
+                                dd_txt=PATH_DAILY_DIAL_TXT_TEST, dd_act=PATH_DAILY_DIAL_ACT_TEST)
+    return load_real_corpus(isear=None, go=PATH_GO_DEV, sst=PATH_SST_DEV,
+                            dd_txt=PATH_DAILY_DIAL_TXT_DEV, dd_act=PATH_DAILY_DIAL_ACT_DEV)
+
+def build_training_counts(use_index=True):
+    # -> (df_final, X_counts, sample_weight)
+    # use_index=False: hash without the persisted feature index (one-off HASH_SIZEs)
+    print("\n--- LOADING DATASETS ---")
+    df_raw = cached_corpus("aura", SOURCES, config=CORPUS_CONFIG, build=load_real_corpus)
+
+
+    # ==========================================
+    # 3. INJECTION & BALANCING
+    # ==========================================
+    if len(df_raw) == 0:
+        print("CRITICAL ERROR: No data loaded from files. Checking Synthetics only.")
+
+    # Token/bigram -> bucket index of the real corpora (memory-mapped when warm)
+    feature_index = None
+    if use_index:
+        feature_index = open_feature_index(
+            "aura", df_raw['clean_text'], sources=SOURCES,
+            hash_size=HASH_SIZE, bigrams=VIEW.bigrams, config=(stem, STOP_WORDS, advanced_clean))
+
+    print("\n--- Injecting Synthetics ---")
+    df_synth = load_synthetics(SYNTHETICS, keep=advanced_clean, weight=SYNTHETIC_AMPLIFICATION)
+    df_synth['clean_text'] = VIEW.cleaner.clean_many(df_synth['text'])
+    df_combined = pd.concat([df_raw.assign(weight=1.0), df_synth])
+
+    # 4. BALANCE
+    print(f"Balancing...")
+    df_final = balance_classes(df_combined, ALL_TARGETS, SAMPLES_PER_CLASS)
+    sample_weight = df_final['weight'].to_numpy()
+    print(f"Balanced: {len(df_final)} unique rows ({sample_weight.sum():.0f} weighted samples)")
+
+    # ==========================================
+    # 5. VECTORIZE & TRAIN
+    # ==========================================
+    print("Hashing...")
+    X_counts = VIEW.hash(df_final['clean_text'], index=feature_index, n_jobs=N_JOBS)
+    return df_final, X_counts, sample_weight
+
+
+def vectorize(X_counts, sample_weight):
+    # hashed counts -> training matrix
+    print("TF-IDF...")
+    X_tfidf, idf = weighted_tfidf(X_counts, sample_weight)
+    return X_tfidf
+
+
+def build_training_set(use_index=True):
+    # -> (df_final, X_tfidf, sample_weight)
+    df_final, X_counts, sample_weight = build_training_counts(use_index)
+    return df_final, vectorize(X_counts, sample_weight), sample_weight
+
+
+def render_blob(models, fmt=None, c=None):
+    # {target: (coef, intercept)} -> specialist_blob_synth.js text; c: {target: searched C}
+    js_output = f"// HYBRID + SYNTHETIC V3 (ALL BINARY)\nvar HASH_SIZE = {HASH_SIZE};\n"
+    for target in ALL_TARGETS:
+        w, intercept = models[target]
+        c_str = c_field((c or {}).get(target))
+        if QUANTIZER != "int8":
+            step, w_str = quant_field(w, QUANTIZER)
+            js_output += f"var MODEL_{target.upper()} = \"b={intercept:.4f};s={step!r}{c_str};{w_str}\";\n"
+            continue
+        max_val = np.max(np.abs(w)) or 1.0
+        scale = 127.0 / max_val
+        w_int = np.clip(np.round(w * scale), -127, 127).astype(int)
+        w_str = weights_field(w_int, fmt=fmt or WEIGHT_FORMAT, threshold=SPARSE_THRESHOLD)
+
+        js_output += f"var MODEL_{target.upper()} = \"b={intercept:.4f};s={1.0/scale:.6f}{c_str};{w_str}\";\n"
+    return js_output
+
+
+def stream_real_corpus(chunk_rows=STREAM_CHUNK_ROWS):
+    # load_real_corpus() a chunk at a time (DailyDialogue: chunk_rows dialogues)
+    streams = [
+        ("ISEAR", iter_isear(PATH_ISEAR, [MAP_ISEAR_EMOTION, MAP_ISEAR_SENTIMENT], chunk_rows)),
+        ("GoEmotions", iter_goemotions(PATH_GO, [MAP_GO_EMOTION, MAP_GO_EPISTEMIC, MAP_GO_SENTIMENT], chunk_rows)),
+        ("SST-2", iter_sst2(PATH_SST, chunk_rows)),
+        ("DailyDialogue", iter_daily_dialogue_acts(PATH_DAILY_DIAL_TXT, PATH_DAILY_DIAL_ACT, DD_MAP,
+                                                   chunk_rows, min_len=5)),
+    ]
+    for name, stream in streams:
+        try:
+            for df in stream:
+                df['clean_text'] = VIEW.clean_chunk(df['text'], n_jobs=N_JOBS)
+                yield df[df['clean_text'].str.len() > 0]
+        except Exception as e:
+            print(f"[FAILED] {name}: {e}")
+
+def stream_training_rows():
+    # synthetics first, then every real corpus row (no balancing)
+    df_synth = load_synthetics(SYNTHETICS, keep=advanced_clean, weight=SYNTHETIC_AMPLIFICATION)
+    df_synth['clean_text'] = VIEW.cleaner.clean_many(df_synth['text'])
+    yield df_synth
+    yield from stream_real_corpus()
+
+
+def train_models():
+    # balanced in-RAM training set -> ({target: (coef, intercept)}, {target: C} or None)
+    df_final, X_tfidf, sample_weight = build_training_set()
+
+    params, best_c = TRAIN_PARAMS, None
+    if SPARSE_BUDGET:
+        params = SPARSE_PARAMS
+    elif C_SEARCH:
+        best_c, _ = search_c(X_tfidf, df_final['label'], ALL_TARGETS, sample_weight, TRAIN_PARAMS, C_PATH,
+                             n_folds=CV_FOLDS, n_jobs=N_JOBS, joint=JOINT_TRAINING)
+        print("C per target: " + ", ".join(f"{t}={c:g}" for t, c in best_c.items()))
+        params = dict(TRAIN_PARAMS, C=best_c)
+
+    print("Training Specialists...")
+    run_key = config_digest([file_digest(p) for p in SOURCES], load_real_corpus, *CORPUS_CONFIG,
+                            HASH_SIZE, SAMPLES_PER_CLASS, SYNTHETIC_AMPLIFICATION, params, SPARSE_BUDGET)
+    models = update_specialists("aura", run_key, X_tfidf, df_final['label'], ALL_TARGETS, sample_weight,
+                                params, SYNTHETICS, incremental=INCREMENTAL,
+                                n_jobs=N_JOBS, joint=JOINT_TRAINING, budget=SPARSE_BUDGET)
+    return models, best_c
+
+
+def main():
+    best_c = None
+    if STREAMING:
+        print("Streaming Specialists...")
+        models = train_streaming(stream_training_rows(), ALL_TARGETS, VIEW, epochs=STREAM_EPOCHS, tfidf=True)
     else:
-        print(f"WARNING: No data found for {target}")
+        models, best_c = train_models()
+    js_output = render_blob(models, fmt="sparse" if SPARSE_BUDGET else None, c=best_c)
 
-df_final = pd.concat(balanced_chunks)
+    with open("specialist_blob_synth.js", "w") as f:
+        f.write(js_output)
 
-# ==========================================
-# 5. VECTORIZE & TRAIN
-# ==========================================
-def fnv1a_32_js(text):
-    h = 2166136261
-    for char in text:
-        h ^= ord(char)
-        h = (h * 16777619) & 0xFFFFFFFF
-    return h
-
-def vectorizer_fnv(text_list, hash_size):
-    matrix = np.zeros((len(text_list), hash_size), dtype=np.float32)
-    for i, text in enumerate(text_list):
-        tokens = text.split()
-        for token in tokens:
-            idx = fnv1a_32_js(token) % hash_size
-            matrix[i, idx] += 1
-        for j in range(len(tokens) - 1):
-            bigram = f"{tokens[j]} {tokens[j+1]}"
-            idx = fnv1a_32_js(bigram) % hash_size
-            matrix[i, idx] += 1
-    return matrix
-
-print("Hashing...")
-X_counts = vectorizer_fnv(df_final['clean_text'].tolist(), HASH_SIZE)
-print("TF-IDF...")
-tfidf = TfidfTransformer(norm='l2', use_idf=True, smooth_idf=True)
-X_tfidf = tfidf.fit_transform(X_counts)
-
-print("Training Specialists...")
-js_output = f"// HYBRID + SYNTHETIC V3 (ALL BINARY)\nvar HASH_SIZE = {HASH_SIZE};\n"
-
-for target in ALL_TARGETS:
-    print(f"Training [{target}]...")
-    y = (df_final['label'] == target).astype(int)
-    
-    clf = LogisticRegression(solver='liblinear', penalty='l2', C=1.0, class_weight='balanced')
-    clf.fit(X_tfidf, y)
-    
-    w = clf.coef_[0]
-    max_val = np.max(np.abs(w)) or 1.0
-    scale = 127.0 / max_val
-    w_int = np.clip(np.round(w * scale), -127, 127).astype(int)
-    w_str = ",".join(map(str, w_int.flatten()))
-    
-    js_output += f"var MODEL_{target.upper()} = \"b={clf.intercept_[0]:.4f};s={1.0/scale:.6f};w={w_str}\";\n"
-
-with open("specialist_blob_synth.js", "w") as f:
-    f.write(js_output)
-
-print("Done.")
\ No newline at end of file
+    print("Done.")
+    return models
+
+
+if __name__ == "__main__":
+    main()
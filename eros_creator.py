@@ -1,9 +1,14 @@
 import pandas as pd
 import numpy as np
-import re
-import csv
-from sklearn.linear_model import LogisticRegression
-from sklearn.utils import resample
+import os
+from featurize import EngineView
+from specialist_export import c_field, quant_field, weights_field
+from feature_index import open_feature_index
+from corpus_cache import cached_corpus
+from build_cache import config_digest, file_digest
+from specialist_training import balance_classes, search_c, update_specialists
+from streaming_training import STREAM_CHUNK_ROWS, train_streaming
+from corpus_loaders import concat_labeled, iter_goemotions, load_goemotions, load_synthetics
 
 # ==========================================
 # CONFIGURATION
@@ -23,9 +28,25 @@ TARGETS = [
 # Matched to your requested output
 HASH_SIZE = 16384 
 SAMPLES_PER_CLASS = 4000
-SYNTHETIC_AMPLIFICATION = 60 
+SYNTHETIC_AMPLIFICATION = 60 # sample weight of each synthetic phrase
+N_JOBS = os.cpu_count() or 1 # parallel specialist fits
+JOINT_TRAINING = False # True: all specialists in one L-BFGS pass
+INCREMENTAL = False # True: retrain only targets whose SYNTHETICS changed (warm start)
+WEIGHT_FORMAT = "csv" # "csv" (w=), "packed" base64 int8 (p=) or "sparse" non-zero buckets (d=)
+SPARSE_THRESHOLD = 0 # sparse export drops buckets with |int8 weight| <= this
+QUANTIZER = "int8" # "int8", or 4-bit "int4" / "group" / "mixed" (q=, ignores WEIGHT_FORMAT)
+TRAIN_PARAMS = dict(solver='liblinear', penalty='l2', C=1.0, class_weight='balanced')
+C_SEARCH = False # True: pick C per target by CV over C_PATH before training
+C_PATH = [0.01, 0.03, 0.1, 0.3, 1.0, 3.0]
+CV_FOLDS = 3
+SPARSE_BUDGET = None # int: L1 specialists with at most this many non-zero buckets each (exported sparse)
+SPARSE_PARAMS = dict(solver='liblinear', penalty='l1', class_weight='balanced') # or solver='saga', penalty='elasticnet', l1_ratio=0.5
+STREAMING = False # True: SGD epochs over the chunked sources in bounded memory (streaming_training.py)
+STREAM_EPOCHS = 5
 
 PATH_GO = "data/GoEmotions/train.tsv"
+PATH_GO_DEV = "data/GoEmotions/dev.tsv" # held out
+PATH_GO_TEST = "data/GoEmotions/test.tsv"
 
 # ==========================================
 # 1. EXPANDED SYNTHETICS (The Pacing Logic)
@@ -146,119 +167,167 @@ def stem(w):
     if w.endswith("s"): return w[:-1]
     return w
 
+# lower -> drop [^a-z0-9\s] -> drop stop words / len <= 2 -> stem, memoized per token;
+# unigrams only hashed into HASH_SIZE buckets
+VIEW = EngineView("eros", stem, STOP_WORDS, HASH_SIZE, bigrams=False)
+
 def advanced_clean(text):
-    text = str(text).lower()
-    text = re.sub(r'[^a-z0-9\s]', '', text)
-    tokens = text.split()
-    tokens = [stem(t) for t in tokens if t not in STOP_WORDS and len(t) > 2]
-    return " ".join(tokens)
+    return VIEW.cleaner.clean(text)
 
 # ==========================================
 # 3. LOADING & PROCESSING
 # ==========================================
-data_pool = []
-count_go = 0
-
-print(f"Loading GoEmotions from {PATH_GO}...")
-try:
-    with open(PATH_GO, 'r', encoding='utf-8') as f:
-        reader = csv.reader(f, delimiter='\t')
-        for row in reader:
-            if len(row) < 2: continue
-            text = row[0]
-            try:
-                indices = [int(x) for x in row[1].split(',')]
-            except ValueError:
-                continue 
-            for idx in indices:
-                if idx in MAP_GO_TO_GATE:
-                    target = MAP_GO_TO_GATE[idx]
-                    data_pool.append({'text': text, 'label': target})
-                    count_go += 1
-except Exception as e:
-    print(f"Error reading GoEmotions: {e}")
-print(f"Loaded {count_go} samples from GoEmotions.")
-
-print("Injecting Synthetics...")
-for label, phrases in SYNTHETICS.items():
-    for p in phrases:
-        clean = advanced_clean(p)
-        if clean:
-            for _ in range(SYNTHETIC_AMPLIFICATION):
-                data_pool.append({'text': p, 'label': label})
-
-df_raw = pd.DataFrame(data_pool)
-df_raw['clean_text'] = df_raw['text'].apply(advanced_clean)
-df_raw = df_raw[df_raw['clean_text'].str.len() > 0]
-
-print(f"Balancing Classes ({SAMPLES_PER_CLASS} per class)...")
-balanced_dfs = []
-for target in TARGETS:
-    df_class = df_raw[df_raw['label'] == target]
-    if len(df_class) == 0:
-        print(f"!! WARNING: No data for {target}")
-        continue
-    df_res = resample(df_class, replace=True, n_samples=SAMPLES_PER_CLASS, random_state=42)
-    balanced_dfs.append(df_res)
-
-df_final = pd.concat(balanced_dfs)
+SOURCES = [PATH_GO]
+# Everything besides SOURCES that shapes the cleaned corpus
+CORPUS_CONFIG = (stem, STOP_WORDS, advanced_clean, MAP_GO_TO_GATE)
 
-# ==========================================
-# 4. TRAINING & EXPORT (Format: AURA v15)
-# ==========================================
-def fnv1a_32_js(text):
-    h = 2166136261
-    for char in text:
-        h ^= ord(char)
-        h = (h * 16777619) & 0xFFFFFFFF
-    return h
-
-def vectorizer_fnv(text_list, hash_size):
-    matrix = np.zeros((len(text_list), hash_size), dtype=np.float32)
-    for i, text in enumerate(text_list):
-        tokens = text.split()
-        for token in tokens:
-            idx = fnv1a_32_js(token) % hash_size
-            matrix[i, idx] += 1
-    return matrix
-
-print("Vectorizing...")
-X = vectorizer_fnv(df_final['clean_text'].tolist(), HASH_SIZE)
-y = df_final['label']
-
-print("Training & Formatting Output...")
-# Initialize Output String
-js_output = f"var HASH_SIZE = {HASH_SIZE};\n"
-
-for target in TARGETS:
-    print(f"  Training [{target}]...")
-    y_binary = (y == target).astype(int)
-    
+def load_real_corpus(go=PATH_GO):
+    df_real = concat_labeled([])
+    print(f"Loading GoEmotions from {go}...")
+    try:
+        df_real = load_goemotions(go, [MAP_GO_TO_GATE])
+    except Exception as e:
+        print(f"Error reading GoEmotions: {e}")
+    print(f"Loaded {len(df_real)} samples from GoEmotions.")
+    df_real['clean_text'] = VIEW.clean(df_real['text'], n_jobs=N_JOBS)
+    return df_real[df_real['clean_text'].str.len() > 0]
+
+def stream_real_corpus(chunk_rows=STREAM_CHUNK_ROWS, go=PATH_GO):
+    # load_real_corpus() a chunk at a time
+    try:
+        for df in iter_goemotions(go, [MAP_GO_TO_GATE], chunk_rows):
+            df['clean_text'] = VIEW.clean_chunk(df['text'], n_jobs=N_JOBS)
+            yield df[df['clean_text'].str.len() > 0]
+    except Exception as e:
+        print(f"[FAILED] GoEmotions: {e}")
+
+def stream_training_rows():
+    # synthetics first, then every real corpus row (no balancing)
+    df_synth = load_synthetics(SYNTHETICS, keep=advanced_clean, weight=SYNTHETIC_AMPLIFICATION)
+    df_synth['clean_text'] = VIEW.cleaner.clean_many(df_synth['text'])
+    yield df_synth
+    yield from stream_real_corpus()
+
+def load_heldout_corpus(split="dev"):
+    # Same labelling on the GoEmotions dev or test split
+    return load_real_corpus(go=PATH_GO_TEST if split == "test" else PATH_GO_DEV)
+
+def build_training_counts(use_index=True):
+    # -> (df_final, X_counts, sample_weight)
+    # use_index=False: hash without the persisted feature index (one-off HASH_SIZEs)
+    df_real = cached_corpus("eros", SOURCES, config=CORPUS_CONFIG, build=load_real_corpus)
+
+    # Token -> bucket index of the real corpus (memory-mapped when warm)
+    feature_index = None
+    if use_index:
+        feature_index = open_feature_index(
+            "eros", df_real['clean_text'], sources=SOURCES,
+            hash_size=HASH_SIZE, bigrams=VIEW.bigrams, config=(stem, STOP_WORDS, advanced_clean))
+
+    print("Injecting Synthetics...")
+    df_synth = load_synthetics(SYNTHETICS, keep=advanced_clean, weight=SYNTHETIC_AMPLIFICATION)
+    df_synth['clean_text'] = VIEW.cleaner.clean_many(df_synth['text'])
+
+    df_raw = pd.concat([df_real.assign(weight=1.0), df_synth], ignore_index=True)
+
+    print(f"Balancing Classes ({SAMPLES_PER_CLASS} per class)...")
+    df_final = balance_classes(df_raw, TARGETS, SAMPLES_PER_CLASS)
+    sample_weight = df_final['weight'].to_numpy()
+    print(f"Balanced: {len(df_final)} unique rows ({sample_weight.sum():.0f} weighted samples)")
+
+    # ==========================================
+    # 4. TRAINING & EXPORT (Format: AURA v15)
+    # ==========================================
+    print("Vectorizing...")
+    X = VIEW.hash(df_final['clean_text'], index=feature_index, n_jobs=N_JOBS)
+    return df_final, X, sample_weight
+
+
+def vectorize(X_counts, sample_weight):
+    # hashed counts -> training matrix (raw counts, like the runtime's sum)
+    return X_counts
+
+
+def build_training_set(use_index=True):
+    # -> (df_final, X, sample_weight)
+    df_final, X_counts, sample_weight = build_training_counts(use_index)
+    return df_final, vectorize(X_counts, sample_weight), sample_weight
+
+
+def render_blob(models, fmt=None, c=None):
+    # {target: (coef, intercept)} -> EROS_Sister_Script.js text; c: {target: searched C}
+    # Initialize Output String
+    js_output = f"var HASH_SIZE = {HASH_SIZE};\n"
+
+    for target in TARGETS:
+        # Quantize and Format
+        w, intercept = models[target]
+        c_str = c_field((c or {}).get(target))
+        if QUANTIZER != "int8":
+            # 4-bit codes from the float weights (q=), with their own step
+            step, w_str = quant_field(w, QUANTIZER)
+            js_output += f"var MODEL_{target.upper()} = \"b={intercept:.4f};s={step!r}{c_str};{w_str}\";\n"
+            continue
+        # We scale weights to be integers for compaction, then normalize via 's' param
+        # Max value becomes 127 (fits in signed 8-bit conceptually, though we store as text)
+        max_val = np.max(np.abs(w)) or 1.0
+        scale = 127.0 / max_val
+        w_int = np.clip(np.round(w * scale), -127, 127).astype(int)
+
+        # Create comma-separated (or packed / sparse base64) string
+        w_str = weights_field(w_int, fmt=fmt or WEIGHT_FORMAT, threshold=SPARSE_THRESHOLD)
+
+        # Format: b=BIAS;s=SCALE[;c=C];w=WEIGHTS (or p=PACKED / d=SPARSE)
+        # Note: 1.0/scale is what we multiply by in JS to get back to original range
+        model_str = f"b={intercept:.4f};s={1.0/scale:.6f}{c_str};{w_str}"
+
+        # Append to JS output
+        var_name = f"MODEL_{target.upper()}"
+        js_output += f"var {var_name} = \"{model_str}\";\n"
+    return js_output
+
+
+
+def train_models():
+    # balanced in-RAM training set -> ({target: (coef, intercept)}, {target: C} or None)
+    df_final, X, sample_weight = build_training_set()
+    y = df_final['label']
+
+    params, best_c = TRAIN_PARAMS, None
+    if SPARSE_BUDGET:
+        params = SPARSE_PARAMS
+    elif C_SEARCH:
+        best_c, _ = search_c(X, y, TARGETS, sample_weight, TRAIN_PARAMS, C_PATH,
+                             n_folds=CV_FOLDS, n_jobs=N_JOBS, joint=JOINT_TRAINING)
+        print("C per target: " + ", ".join(f"{t}={c:g}" for t, c in best_c.items()))
+        params = dict(TRAIN_PARAMS, C=best_c)
+
+    print("Training & Formatting Output...")
     # Using simple Logistic Regression (matches the simple sum in JS)
-    clf = LogisticRegression(solver='liblinear', penalty='l2', C=1.0, class_weight='balanced')
-    clf.fit(X, y_binary)
-    
-    # Quantize and Format
-    w = clf.coef_[0]
-    # We scale weights to be integers for compaction, then normalize via 's' param
-    # Max value becomes 127 (fits in signed 8-bit conceptually, though we store as text)
-    max_val = np.max(np.abs(w)) or 1.0
-    scale = 127.0 / max_val
-    w_int = np.clip(np.round(w * scale), -127, 127).astype(int)
-    
-    # Create comma-separated string
-    w_str = ",".join(map(str, w_int.flatten()))
-    
-    # Format: b=BIAS;s=SCALE;w=WEIGHTS
-    # Note: 1.0/scale is what we multiply by in JS to get back to original range
-    model_str = f"b={clf.intercept_[0]:.4f};s={1.0/scale:.6f};w={w_str}"
-    
-    # Append to JS output
-    var_name = f"MODEL_{target.upper()}"
-    js_output += f"var {var_name} = \"{model_str}\";\n"
-
-# Write to file
-with open("EROS_Sister_Script.js", "w") as f:
-    f.write(js_output)
-
-print("DONE. File saved as 'EROS_Sister_Script.js'.")
\ No newline at end of file
+    run_key = config_digest([file_digest(p) for p in SOURCES], load_real_corpus, *CORPUS_CONFIG,
+                            HASH_SIZE, SAMPLES_PER_CLASS, SYNTHETIC_AMPLIFICATION, params, SPARSE_BUDGET)
+    models = update_specialists("eros", run_key, X, y, TARGETS, sample_weight,
+                                params, SYNTHETICS, incremental=INCREMENTAL,
+                                n_jobs=N_JOBS, joint=JOINT_TRAINING, budget=SPARSE_BUDGET)
+    return models, best_c
+
+
+def main():
+    best_c = None
+    if STREAMING:
+        print("Streaming Specialists...")
+        models = train_streaming(stream_training_rows(), TARGETS, VIEW, epochs=STREAM_EPOCHS)
+    else:
+        models, best_c = train_models()
+    js_output = render_blob(models, fmt="sparse" if SPARSE_BUDGET else None, c=best_c)
+
+    # Write to file
+    with open("EROS_Sister_Script.js", "w") as f:
+        f.write(js_output)
+
+    print("DONE. File saved as 'EROS_Sister_Script.js'.")
+    return models
+
+
+if __name__ == "__main__":
+    main()
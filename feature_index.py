@@ -0,0 +1,116 @@
+import json
+import os
+import tempfile
+
+import numpy as np
+
+import text_clean
+from build_cache import config_digest, entry_dir, file_digest, prune_stale, publish
+from fnv_hash import FnvBucketCache, fnv1a_32_batch, row_features
+
+# ==========================================
+# PERSISTENT HASHED-FEATURE INDEX
+# ==========================================
+# Maps every unique cleaned token / bigram of a corpus to its FNV bucket
+# and document frequency. Stored as sorted .npy columns so later runs can
+# memory-map it and look features up with a binary search.
+INDEX_VERSION = 1
+
+
+class FeatureIndex:
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.hash_size = self.meta["hash_size"]
+        self.n_docs = self.meta["n_docs"]
+        self.features = np.load(os.path.join(path, "features.npy"), mmap_mode="r")
+        self.buckets = np.load(os.path.join(path, "buckets.npy"), mmap_mode="r")
+        self.doc_freq = np.load(os.path.join(path, "doc_freq.npy"), mmap_mode="r")
+
+    def __len__(self):
+        return len(self.features)
+
+    def __reduce__(self):
+        # Pickled (e.g. to pool workers) as its path; re-opened memory-mapped.
+        return (FeatureIndex, (self.path,))
+
+    def find(self, feats):
+        # Position of each feature in the index, -1 when not indexed.
+        if len(self.features) == 0 or len(feats) == 0:
+            return np.full(len(feats), -1, dtype=np.int64)
+        raw = np.array([t.encode("utf-8") for t in feats], dtype=bytes)
+        # Anything wider than the stored column cannot be indexed (and would
+        # be truncated by the cast below).
+        fits = np.char.str_len(raw) <= self.features.dtype.itemsize
+        q = raw.astype(self.features.dtype)
+        pos = np.searchsorted(self.features, q)
+        pos[pos == len(self.features)] = 0
+        hit = (self.features[pos] == q) & fits
+        return np.where(hit, pos, -1)
+
+    def by_bucket(self):
+        # Reverse index: features of bucket b are
+        # self.features[order[starts[b]:starts[b + 1]]]
+        order = np.argsort(self.buckets, kind="stable")
+        starts = np.searchsorted(self.buckets[order], np.arange(self.hash_size + 1))
+        return order, starts
+
+    def lookup(self, feats, cache=None):
+        # Buckets for a flat feature list; misses fall back to the hash cache.
+        uniq = list(dict.fromkeys(feats))
+        pos = self.find(uniq)
+        uniq_buckets = np.empty(len(uniq), dtype=np.int64)
+        hit = pos >= 0
+        uniq_buckets[hit] = self.buckets[pos[hit]]
+        if not hit.all():
+            cache = FnvBucketCache() if cache is None else cache
+            misses = [uniq[i] for i in np.flatnonzero(~hit)]
+            uniq_buckets[~hit] = cache.buckets(misses, self.hash_size)
+        ids = {t: i for i, t in enumerate(uniq)}
+        return uniq_buckets[np.fromiter(map(ids.__getitem__, feats), dtype=np.int64, count=len(feats))]
+
+
+def build_feature_index(path, texts, hash_size, bigrams=True, key=""):
+    feats, rows = row_features(list(texts), bigrams=bigrams)
+    ids = {}
+    feat_ids = np.fromiter((ids.setdefault(t, len(ids)) for t in feats), dtype=np.int64, count=len(feats))
+    uniq = list(ids)
+
+    # Document frequency: count each (row, feature) pair once.
+    pairs = np.unique(rows * max(len(uniq), 1) + feat_ids)
+    doc_freq = np.bincount(pairs % max(len(uniq), 1), minlength=len(uniq)).astype(np.int64)
+
+    encoded = np.array([t.encode("utf-8") for t in uniq], dtype=bytes) if uniq else np.zeros(0, dtype="S1")
+    order = np.argsort(encoded, kind="stable")
+    buckets = (fnv1a_32_batch(uniq) % np.uint32(hash_size)).astype(np.int32)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=os.path.dirname(path))
+    np.save(os.path.join(tmp, "features.npy"), encoded[order])
+    np.save(os.path.join(tmp, "buckets.npy"), buckets[order])
+    np.save(os.path.join(tmp, "doc_freq.npy"), doc_freq[order])
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump({"key": key, "hash_size": hash_size, "bigrams": bigrams,
+                   "n_docs": len(texts), "n_features": len(uniq)}, f)
+    publish(tmp, path)
+    return FeatureIndex(path)
+
+
+def open_feature_index(name, texts, sources, hash_size, bigrams=True, config=(), prune=True):
+    """Memory-map the index for this corpus, building it on a cache miss.
+
+    `config` holds whatever shapes the cleaned text (stem, STOP_WORDS,
+    advanced_clean); together with the source file contents, HASH_SIZE
+    and the bigram flag it forms the cache key. prune=False keeps the
+    other indexes of `name` (an index keyed unlike the creator's).
+    """
+    key = config_digest(INDEX_VERSION, [file_digest(p) for p in sources],
+                        file_digest(text_clean.__file__), hash_size, bigrams, *config)
+    path = entry_dir("feature_index", name, key)
+    if os.path.isfile(os.path.join(path, "meta.json")):
+        return FeatureIndex(path)
+    index = build_feature_index(path, texts, hash_size, bigrams=bigrams, key=key)
+    if prune:
+        prune_stale("feature_index", name, keep=path)
+    return index
@@ -0,0 +1,117 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy import sparse
+
+from fnv_hash import FnvBucketCache, vectorizer_fnv
+from text_clean import TextCleaner
+
+# ==========================================
+# CHUNKED CLEAN + HASH STAGE
+# ==========================================
+# The text column is cut into CHUNK_ROWS-row chunks; each chunk is cleaned
+# (TextCleaner) and/or FNV-bucketed in a worker process. Workers send back
+# only compact (row, bucket, count) int32 triplets, which are merged into
+# one CSR matrix. Every worker builds its own token / hash memo once (pool
+# initializer) and reuses it for all the chunks it gets.
+CHUNK_ROWS = 20000
+
+_WORKER = {}
+
+
+def _init_worker(cleaner, hash_size, bigrams, index, cache=None):
+    _WORKER.update(cleaner=cleaner, hash_size=hash_size, bigrams=bigrams, index=index, cache=cache)
+
+
+def _run_chunk(task):
+    start, texts = task
+    cleaner = _WORKER["cleaner"]
+    clean = cleaner.clean_many(texts) if cleaner is not None else np.asarray(texts, dtype=object)
+    if _WORKER["hash_size"] is None:
+        return start, clean, None
+    X = vectorizer_fnv(list(clean), _WORKER["hash_size"], bigrams=_WORKER["bigrams"],
+                       cache=_WORKER["cache"], index=_WORKER["index"]).tocoo()
+    triplets = (X.row.astype(np.int32), X.col.astype(np.int32), X.data.astype(np.int32))
+    return start, clean, triplets
+
+
+def _chunks(texts, chunk_rows):
+    for start in range(0, len(texts), chunk_rows):
+        yield start, texts[start:start + chunk_rows]
+
+
+def clean_and_hash(texts, cleaner=None, hash_size=None, bigrams=True, index=None,
+                   n_jobs=1, chunk_rows=CHUNK_ROWS, cache=None):
+    """Clean and/or hash a text column, in parallel chunks.
+
+    cleaner=None     -> `texts` are already clean; only hash them.
+    hash_size=None   -> only clean; the matrix is None.
+    cache=None       -> the process-wide token -> hash memo (fnv_hash).
+    Returns (clean_text object array, float32 CSR counts or None). The
+    result is the same as cleaner.clean_many() + vectorizer_fnv() on the
+    whole column, whatever n_jobs and chunk_rows are.
+    """
+    texts = np.asarray(texts, dtype=object)
+    state = (cleaner, hash_size, bigrams, index, cache)
+    tasks = _chunks(texts, chunk_rows)
+    n_jobs = min(n_jobs or 1, -(-len(texts) // chunk_rows))
+    if n_jobs <= 1:
+        _init_worker(*state)
+        results = list(map(_run_chunk, tasks))
+        _WORKER.clear()
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker,
+                                 initargs=state) as pool:
+            results = list(pool.map(_run_chunk, tasks))
+
+    clean = np.concatenate([c for _, c, _ in results]) if results else np.zeros(0, dtype=object)
+    if hash_size is None:
+        return clean, None
+    rows = np.concatenate([t[0].astype(np.int64) + start for start, _, t in results] or [np.zeros(0, np.int64)])
+    cols = np.concatenate([t[1] for _, _, t in results] or [np.zeros(0, np.int32)])
+    counts = np.concatenate([t[2] for _, _, t in results] or [np.zeros(0, np.int32)])
+    X = sparse.csr_matrix((counts.astype(np.float32), (rows, cols)), shape=(len(texts), hash_size))
+    X.sum_duplicates()
+    return clean, X
+
+
+# ==========================================
+# PER-ENGINE VIEWS
+# ==========================================
+# AURA, EROS and EIDOS read overlapping corpora (GoEmotions, DailyDialogue)
+# but differ in stop words, stemmer and n-grams. An EngineView holds one
+# engine's settings on top of the shared stages: parsing is memoized in
+# corpus_loaders and the chunk -> stripped-token table in text_clean, so
+# running every creator in one process (build_all.py) parses and tokenizes
+# each source once; only stop-word filtering, stemming and hashing run per
+# engine.
+
+
+class EngineView:
+    def __init__(self, name, stem, stop_words, hash_size, bigrams):
+        self.name = name
+        self.cleaner = TextCleaner(stem, stop_words)
+        self.hash_size = hash_size
+        self.bigrams = bigrams
+
+    def clean(self, texts, n_jobs=1):
+        return clean_and_hash(texts, cleaner=self.cleaner, n_jobs=n_jobs)[0]
+
+    def hash(self, clean_texts, index=None, n_jobs=1):
+        return clean_and_hash(clean_texts, hash_size=self.hash_size, bigrams=self.bigrams,
+                              index=index, n_jobs=n_jobs)[1]
+
+    def clean_chunk(self, texts, n_jobs=1):
+        # clean() with memos that live for this call only: streamed chunks
+        # leave nothing behind that grows with the vocabulary
+        return clean_and_hash(texts, cleaner=self.cleaner.fresh(), n_jobs=n_jobs)[0]
+
+    def hash_chunk(self, clean_texts):
+        # hash() with a throwaway token -> hash memo
+        return clean_and_hash(clean_texts, hash_size=self.hash_size, bigrams=self.bigrams,
+                              cache=FnvBucketCache())[1]
+
+    def featurize(self, texts, index=None, n_jobs=1):
+        # raw texts -> (clean_text, counts) in one pass
+        return clean_and_hash(texts, cleaner=self.cleaner, hash_size=self.hash_size,
+                              bigrams=self.bigrams, index=index, n_jobs=n_jobs)
@@ -0,0 +1,118 @@
+import numpy as np
+from scipy import sparse
+
+# ==========================================
+# FNV-1a (32-bit) HASHING ENGINE
+# ==========================================
+# Shared by emotion_creator2.py, eros_creator.py and intent_creator.py.
+# Buckets must match the runtime `fnv1a32(str) % HASH_SIZE` in the JS
+# engines, which hashes UTF-16 code units (`charCodeAt`).
+
+FNV_OFFSET = np.uint32(2166136261)
+FNV_PRIME = np.uint32(16777619)
+
+
+def fnv1a_32_js(text):
+    # Scalar reference implementation (one UTF-16 code unit at a time, so a
+    # character outside the BMP is its two surrogates, as in the JS).
+    h = 2166136261
+    units = text.encode("utf-16-le", "surrogatepass")
+    for i in range(0, len(units), 2):
+        h ^= units[i] | (units[i + 1] << 8)
+        h = (h * 16777619) & 0xFFFFFFFF
+    return h
+
+
+def fnv1a_32_batch(strings):
+    """Hash a list of strings at once. Returns a uint32 array.
+
+    Strings are sorted by length so that, at character position j, the
+    strings still being hashed form a contiguous prefix; each position is
+    then one vectorized xor/multiply over that prefix.
+    """
+    n = len(strings)
+    if n == 0:
+        return np.zeros(0, dtype=np.uint32)
+
+    units = [np.frombuffer(s.encode("utf-16-le", "surrogatepass"), dtype="<u2") for s in strings]
+    lengths = np.fromiter((u.size for u in units), dtype=np.int64, count=n)
+    flat = np.concatenate(units).astype(np.uint32)
+    offsets = np.zeros(n, dtype=np.int64)
+    np.cumsum(lengths[:-1], out=offsets[1:])
+
+    order = np.argsort(-lengths, kind="stable")
+    starts = offsets[order]
+    max_len = int(lengths.max())
+    # n_longer[j] = number of strings with length > j
+    n_longer = n - np.cumsum(np.bincount(lengths, minlength=max_len + 1))
+
+    h = np.full(n, FNV_OFFSET, dtype=np.uint32)
+    for j in range(max_len):
+        k = n_longer[j]
+        hv = h[:k]
+        hv ^= flat[starts[:k] + j]
+        hv *= FNV_PRIME  # wraps mod 2^32 like Math.imul
+
+    out = np.empty(n, dtype=np.uint32)
+    out[order] = h
+    return out
+
+
+class FnvBucketCache:
+    """Memoized token -> FNV hash table.
+
+    The full 32-bit hash is stored, so one cache serves every HASH_SIZE
+    (bucket = hash % hash_size, exactly like the runtime).
+    """
+
+    def __init__(self):
+        self._table = {}
+
+    def __len__(self):
+        return len(self._table)
+
+    def hashes(self, tokens):
+        table = self._table
+        missing = [t for t in set(tokens) if t not in table]
+        if missing:
+            table.update(zip(missing, fnv1a_32_batch(missing).tolist()))
+        return np.fromiter(map(table.__getitem__, tokens), dtype=np.uint32, count=len(tokens))
+
+    def buckets(self, tokens, hash_size):
+        return (self.hashes(tokens) % np.uint32(hash_size)).astype(np.int64)
+
+
+_SHARED_CACHE = FnvBucketCache()
+
+
+def row_features(text_list, bigrams=True):
+    # Flatten every row's tokens (and optional "a b" bigrams, same order as
+    # the runtime's allTokens) into one list plus the owning row ids.
+    feats = []
+    counts = np.zeros(len(text_list), dtype=np.int64)
+    for i, text in enumerate(text_list):
+        tokens = text.split()
+        feats.extend(tokens)
+        n = len(tokens)
+        if bigrams and n > 1:
+            feats.extend([f"{tokens[j]} {tokens[j+1]}" for j in range(n - 1)])
+            n += n - 1
+        counts[i] = n
+    rows = np.repeat(np.arange(len(text_list)), counts)
+    return feats, rows
+
+
+def vectorizer_fnv(text_list, hash_size, bigrams=True, cache=None, index=None):
+    # `index` is an optional FeatureIndex (feature_index.py) built for the
+    # same HASH_SIZE; indexed features skip hashing entirely.
+    cache = _SHARED_CACHE if cache is None else cache
+    feats, rows = row_features(text_list, bigrams=bigrams)
+    if index is not None and index.hash_size == hash_size:
+        cols = index.lookup(feats, cache=cache)
+    else:
+        cols = cache.buckets(feats, hash_size)
+    # COO -> CSR sums repeated (row, bucket) pairs into counts.
+    data = np.ones(len(cols), dtype=np.float32)
+    matrix = sparse.csr_matrix((data, (rows, cols)), shape=(len(text_list), hash_size))
+    matrix.sum_duplicates()
+    return matrix
@@ -0,0 +1,128 @@
+import importlib
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy import sparse
+from sklearn.metrics import roc_auc_score
+
+from sparse_export_report import heldout_matrix
+from specialist_training import train_specialists
+
+# ==========================================
+# HASH_SIZE SWEEP BY BUCKET FOLDING
+# ==========================================
+# Usage: python hash_sweep.py [aura|eros|eidos] [tolerance]
+# Hashes the training set and the held-out split once into 2^WIDE_BITS
+# buckets. Every power of two n <= 2^WIDE_BITS divides 2^WIDE_BITS, so
+#   (fnv1a32 % 2^WIDE_BITS) % n == fnv1a32 % n
+# and the matrix for HASH_SIZE n is the wide one with its columns folded
+# modulo n -- exactly the runtime's `% HASH_SIZE`, without re-hashing.
+# The wide hash bypasses the creator's feature index, so the sweep neither
+# caches a 2^WIDE_BITS index nor evicts the shipped one.
+# Each size is then trained (the creator's own vectorize + TRAIN_PARAMS) and
+# scored on the held-out split the way the runtime scores: bias + sum of
+# weights over token counts, fires when > 0. Sizes run in parallel.
+#
+# The recommendation is the smallest size whose mean held-out accuracy is
+# within `tolerance` of the best size.
+ENGINES = {
+    "aura": ("emotion_creator2", "ALL_TARGETS"),
+    "eros": ("eros_creator", "TARGETS"),
+    "eidos": ("intent_creator", "TARGETS"),
+}
+WIDE_BITS = 22
+SWEEP_BITS = range(10, 19)  # 1024 .. 262144
+TOLERANCE = 0.005
+
+_WORKER = {}
+
+
+def fold(X, hash_size):
+    # wide CSR -> same rows over hash_size buckets (column % hash_size)
+    X = X.tocsr()
+    # sum_duplicates works in place: give it copies, not views of X
+    folded = sparse.csr_matrix((X.data.copy(), X.indices % hash_size, X.indptr.copy()),
+                               shape=(X.shape[0], hash_size))
+    folded.sum_duplicates()
+    return folded
+
+
+def _init_worker(module_name, targets, X, labels, sample_weight, X_heldout, y_heldout):
+    _WORKER.update(creator=importlib.import_module(module_name), targets=targets, X=X, labels=labels,
+                   sample_weight=sample_weight, X_heldout=X_heldout, y_heldout=y_heldout)
+
+
+def _sweep_size(hash_size):
+    w = _WORKER
+    start = time.perf_counter()
+    X_counts = fold(w["X"], hash_size)
+    X = w["creator"].vectorize(X_counts, w["sample_weight"])
+    models = train_specialists(X, w["labels"], w["targets"], w["sample_weight"],
+                               w["creator"].TRAIN_PARAMS, n_jobs=1)
+    train_s = time.perf_counter() - start
+
+    X_heldout = fold(w["X_heldout"], hash_size)
+    accuracy, auc = [], []
+    for target in w["targets"]:
+        coef, intercept = models[target]
+        score = X_heldout @ coef + intercept
+        y = w["y_heldout"][target]
+        accuracy.append(((score > 0) == y).mean())
+        if y.any() and not y.all():
+            auc.append(roc_auc_score(y, score))
+    return hash_size, train_s, float(np.mean(accuracy)), float(np.mean(auc)) if auc else float("nan")
+
+
+def sweep(engine, sizes=None):
+    # -> [(hash_size, train seconds, mean held-out accuracy, mean AUC)]
+    module_name, targets_name = ENGINES[engine]
+    creator = importlib.import_module(module_name)
+    targets = getattr(creator, targets_name)
+    sizes = sizes or [2 ** b for b in SWEEP_BITS]
+    wide = 2 ** WIDE_BITS
+    if any(wide % n for n in sizes):
+        raise ValueError(f"Sweep sizes must divide 2^{WIDE_BITS}: {sizes}")
+
+    shipped = creator.HASH_SIZE
+    creator.HASH_SIZE = creator.VIEW.hash_size = wide
+    try:
+        print(f"Hashing once into 2^{WIDE_BITS} buckets...")
+        df_final, X_wide, sample_weight = creator.build_training_counts(use_index=False)
+        X_heldout, y_heldout = heldout_matrix(creator, targets)
+    finally:
+        creator.HASH_SIZE = creator.VIEW.hash_size = shipped
+
+    state = (module_name, targets, X_wide, df_final['label'].to_numpy(dtype=object),
+             sample_weight, X_heldout, y_heldout)
+    n_jobs = min(creator.N_JOBS, len(sizes))
+    if n_jobs <= 1:
+        _init_worker(*state)
+        results = list(map(_sweep_size, sizes))
+        _WORKER.clear()
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=state) as pool:
+            results = list(pool.map(_sweep_size, sizes))
+    return results
+
+
+def recommend(results, tolerance=TOLERANCE):
+    best = max(acc for _, _, acc, _ in results)
+    return min(size for size, _, acc, _ in results if acc >= best - tolerance)
+
+
+def main(engine="aura", tolerance=TOLERANCE):
+    results = sweep(engine)
+    tolerance = float(tolerance)
+    choice = recommend(results, tolerance)
+    print(f"\n--- {engine.upper()}: HASH_SIZE sweep (folded from 2^{WIDE_BITS}) ---")
+    print(f"{'HASH_SIZE':>10}{'train s':>9}{'accuracy':>10}{'AUC':>8}")
+    for size, train_s, acc, auc in results:
+        mark = "  <- recommended" if size == choice else ""
+        print(f"{size:>10}{train_s:>9.2f}{acc:>10.4f}{auc:>8.4f}{mark}")
+    print(f"Smallest HASH_SIZE within {tolerance} of the best accuracy: {choice}")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
@@ -0,0 +1,169 @@
+import importlib
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from reference_scorer import ENGINES as RUNTIME, BlobScorer
+from sparse_export_report import model_name
+from specialist_training import train_specialists
+
+# ==========================================
+# HELD-OUT EVALUATION OF THE EXPORTED BLOBS
+# ==========================================
+# Usage: python heldout_eval.py [aura|eros|eidos ...]
+# Runs the creator's main() as configured in its module, then scores the
+# blob it wrote and the float models it returned on every split in SPLITS:
+# the dev / validation and test files the creators never train on.
+# Decisions are the runtime's (BlobScorer.fire): the AURA emotion heads go
+# through the argmax with its 0.55 confidence (neutral never fires), every
+# other head fires on "score > 0". They are taken on four score matrices,
+# each one sparse product over the whole split ("int8" below is whatever
+# the blob holds):
+#
+#              train featurization         runtime featurization
+#   float      clean_text -> VIEW.hash     runtime_tokens % 16384
+#   int8       same, blob weights          BlobScorer (what the JS computes)
+#
+# Per target it reports precision / recall / F1 of the shipped path (int8,
+# runtime) and two F1 gaps, each measured with the other factor held fixed:
+#   quant  F1(float, runtime) - F1(int8, runtime)
+#   feat   F1(int8, train) - F1(int8, runtime)
+# plus the share of messages whose decision each one flips.
+#
+# AURA trains on tf-idf rows, but its runtime sums raw counts. Both columns
+# above are counts, so "feat" isolates the tokenizer (advanced_clean +
+# creator stemmer + the creator's n-grams vs the JS normalize / stem /
+# always-on bigrams).
+ENGINES = {
+    "aura": ("emotion_creator2", "ALL_TARGETS"),
+    "eros": ("eros_creator", "TARGETS"),
+    "eidos": ("intent_creator", "TARGETS"),
+}
+SPLITS = ["dev", "test"]
+
+
+def heldout_split(creator, targets, split):
+    # -> (raw texts, creator clean_text per text, (n_texts, n_targets) bool labels)
+    df = creator.load_heldout_corpus(split)
+    df = df[df['label'].isin(targets)]
+    first = df.drop_duplicates('text')
+    texts = pd.Index(first['text'])
+    rows = texts.get_indexer(df['text'])
+    cols = pd.Index(targets).get_indexer(df['label'])
+    labels = np.zeros((len(texts), len(targets)), dtype=bool)
+    labels[rows, cols] = True
+    return list(texts), first['clean_text'].to_numpy(dtype=object), labels
+
+
+def f1_stats(decisions, labels):
+    # column-wise (precision, recall, F1) of bool matrices
+    tp = (decisions & labels).sum(axis=0)
+    precision = tp / np.maximum(decisions.sum(axis=0), 1)
+    recall = tp / np.maximum(labels.sum(axis=0), 1)
+    f1 = 2 * tp / np.maximum(decisions.sum(axis=0) + labels.sum(axis=0), 1)
+    return precision, recall, f1
+
+
+def score_split(creator, scorer, coef, intercept, texts, clean):
+    # -> {(weights, featurization): (n_texts, n_heads) scores}
+    X_train = creator.VIEW.hash(clean)[:, :scorer.modulus]
+    X_runtime = scorer.featurize(texts)[0]
+    int8 = lambda X: scorer.bias + scorer.scale * np.asarray(X @ scorer.weights)
+    return {
+        ("float", "train"): np.asarray(X_train @ coef) + intercept,
+        ("float", "runtime"): np.asarray(X_runtime @ coef) + intercept,
+        ("int8", "train"): int8(X_train),
+        ("int8", "runtime"): scorer.scores(texts),
+    }
+
+
+def blob_scorer(engine, creator, models, fmt=None):
+    # -> (BlobScorer of creator.render_blob(models, fmt), blob bytes)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "blob.js")
+        with open(path, "w") as f:
+            f.write(creator.render_blob(models, fmt=fmt))
+        return BlobScorer(engine, path), os.path.getsize(path)
+
+
+def float_heads(creator, scorer, targets, models):
+    # -> (scorer columns of the trained heads, their targets, float coef and
+    #     intercept laid out like scorer.weights / scorer.bias)
+    heads = [(k, t) for t in targets for k, name in enumerate(scorer.names)
+             if name == model_name(creator, t) and scorer.present[k]]
+    coef = np.zeros((scorer.modulus, len(scorer.names)))
+    intercept = np.array(scorer.bias)
+    for k, t in heads:
+        w, intercept[k] = models[t]
+        n = min(len(w), scorer.modulus)
+        coef[:n, k] = w[:n]
+    return [k for k, _ in heads], [t for _, t in heads], coef, intercept
+
+
+def evaluate(engine, creator, models, splits=SPLITS, blob=None):
+    """Score `models` ({target: (coef, intercept)}) and the blob exported from them.
+
+    `blob` defaults to the file the creator's main() writes. Returns
+    {split: {target: {...}}} and prints one table per split.
+    """
+    targets = getattr(creator, ENGINES[engine][1])
+    scorer = BlobScorer(engine, blob or RUNTIME[engine]["blob"])
+    cols, head_targets, coef, intercept = float_heads(creator, scorer, targets, models)
+    if not cols:
+        print(f"{engine.upper()}: no trained models to evaluate")
+        return {}
+
+    report = {}
+    for split in splits:
+        texts, clean, labels = heldout_split(creator, targets, split)
+        labels = labels[:, [targets.index(t) for t in head_targets]]
+        start = time.perf_counter()
+        scores = score_split(creator, scorer, coef, intercept, texts, clean)
+        shipped = scorer.decide(texts)
+        elapsed = time.perf_counter() - start
+        fired = {key: scorer.fire(s)[:, cols] for key, s in scores.items()}
+        keys = scorer.keys()
+        shipped = np.column_stack([shipped[keys[k]] for k in cols])
+        precision, recall, f1 = f1_stats(shipped, labels)
+        quant_gap = f1_stats(fired[("float", "runtime")], labels)[2] - f1
+        feat_gap = f1_stats(fired[("int8", "train")], labels)[2] - f1
+        quant_flips = (fired[("float", "runtime")] != shipped).mean(axis=0)
+        feat_flips = (fired[("int8", "train")] != shipped).mean(axis=0)
+
+        print(f"\n--- {engine.upper()} {split}: {len(texts)} messages, scored in {elapsed:.2f}s ---")
+        print(f"{'target':<13}{'pos':>6}{'prec':>7}{'recall':>8}{'F1':>7}"
+              f"{'quant':>8}{'flips':>7}{'feat':>8}{'flips':>7}")
+        report[split] = {}
+        for j, t in enumerate(head_targets):
+            row = dict(positives=int(labels[:, j].sum()), precision=float(precision[j]),
+                       recall=float(recall[j]), f1=float(f1[j]), quant_gap=float(quant_gap[j]),
+                       quant_flips=float(quant_flips[j]), feat_gap=float(feat_gap[j]),
+                       feat_flips=float(feat_flips[j]))
+            report[split][t] = row
+            print(f"{t:<13}{row['positives']:>6}{row['precision']:>7.3f}{row['recall']:>8.3f}"
+                  f"{row['f1']:>7.3f}{row['quant_gap']:>+8.3f}{row['quant_flips']:>7.1%}"
+                  f"{row['feat_gap']:>+8.3f}{row['feat_flips']:>7.1%}")
+        print(f"{'mean':<13}{'':>6}{precision.mean():>7.3f}{recall.mean():>8.3f}{f1.mean():>7.3f}"
+              f"{quant_gap.mean():>+8.3f}{quant_flips.mean():>7.1%}{feat_gap.mean():>+8.3f}{feat_flips.mean():>7.1%}")
+    return report
+
+
+def train_float(creator, targets):
+    # the creator's float specialists, as its main() trains them (no C search)
+    df_final, X, sample_weight = creator.build_training_set()
+    return train_specialists(X, df_final['label'].to_numpy(dtype=object), targets, sample_weight,
+                             creator.TRAIN_PARAMS, n_jobs=creator.N_JOBS, joint=creator.JOINT_TRAINING)
+
+
+def main(*engines):
+    for engine in engines or tuple(ENGINES):
+        creator = importlib.import_module(ENGINES[engine][0])
+        evaluate(engine, creator, creator.main())
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
@@ -1,11 +1,16 @@
 import pandas as pd
 import numpy as np
-import re
-import csv
 import os
-from sklearn.linear_model import LogisticRegression
-from sklearn.utils import resample
 from sklearn.feature_extraction.text import TfidfTransformer
+from featurize import EngineView
+from specialist_export import c_field, quant_field, weights_field
+from feature_index import open_feature_index
+from corpus_cache import cached_corpus
+from build_cache import config_digest, file_digest
+from specialist_training import balance_classes, search_c, update_specialists
+from streaming_training import STREAM_CHUNK_ROWS, train_streaming
+from corpus_loaders import (concat_labeled, iter_daily_dialogue, iter_persona_chat, load_persona_chat,
+                            load_synthetics, map_labels, read_daily_dialogue)
 
 # ==========================================
 # CONFIGURATION
@@ -24,13 +29,34 @@ TARGETS = [
 
 HASH_SIZE = 16384 # Fits comfortably in 9-gate budget
 SAMPLES_PER_CLASS = 4000
-SYNTHETIC_AMPLIFICATION = 50 
+SYNTHETIC_AMPLIFICATION = 50 # sample weight of each synthetic phrase
+N_JOBS = os.cpu_count() or 1 # parallel specialist fits
+JOINT_TRAINING = False # True: all specialists in one L-BFGS pass
+INCREMENTAL = False # True: retrain only targets whose SYNTHETICS changed (warm start)
+WEIGHT_FORMAT = "csv" # "csv" (w=), "packed" base64 int8 (p=) or "sparse" non-zero buckets (d=)
+SPARSE_THRESHOLD = 0 # sparse export drops buckets with |int8 weight| <= this
+QUANTIZER = "int8" # "int8", or 4-bit "int4" / "group" / "mixed" (q=, ignores WEIGHT_FORMAT)
+TRAIN_PARAMS = dict(solver='liblinear', penalty='l2', C=1.0, class_weight='balanced')
+C_SEARCH = False # True: pick C per target by CV over C_PATH before training
+C_PATH = [0.01, 0.03, 0.1, 0.3, 1.0, 3.0]
+CV_FOLDS = 3
+SPARSE_BUDGET = None # int: L1 specialists with at most this many non-zero buckets each (exported sparse)
+SPARSE_PARAMS = dict(solver='liblinear', penalty='l1', class_weight='balanced') # or solver='saga', penalty='elasticnet', l1_ratio=0.5
+STREAMING = False # True: SGD epochs over the chunked sources in bounded memory (streaming_training.py)
+STREAM_EPOCHS = 5
 
 # PATHS (Adjusted to your tree.txt structure)
 PATH_DD_TXT = "data/DailyDialogue/dialogues_train.txt"
 PATH_DD_ACT = "data/DailyDialogue/dialogues_act_train.txt"
 PATH_DD_EMO = "data/DailyDialogue/dialogues_emotion_train.txt"
 PATH_PERSONA = "data/PersonaChat/personality.csv"
+# Held-out splits (never trained on)
+PATH_DD_TXT_DEV = "data/DailyDialogue/dialogues_validation.txt"
+PATH_DD_ACT_DEV = "data/DailyDialogue/dialogues_act_validation.txt"
+PATH_DD_EMO_DEV = "data/DailyDialogue/dialogues_emotion_validation.txt"
+PATH_DD_TXT_TEST = "data/DailyDialogue/dialogues_test.txt"
+PATH_DD_ACT_TEST = "data/DailyDialogue/dialogues_act_test.txt"
+PATH_DD_EMO_TEST = "data/DailyDialogue/dialogues_emotion_test.txt"
 
 # ==========================================
 # 1. SYNTHETIC DICTIONARIES (For gaps in data)
@@ -143,155 +169,92 @@ def stem(w):
     if w.endswith("ed"): return w[:-2]
     return w
 
+# lower -> drop [^a-z0-9\s] -> drop stop words / len <= 2 -> stem, memoized per token;
+# unigrams only hashed into HASH_SIZE buckets
+VIEW = EngineView("eidos", stem, STOP_WORDS, HASH_SIZE, bigrams=False)
+
 def advanced_clean(text):
-    text = str(text).lower()
-    text = re.sub(r'[^a-z0-9\s]', '', text)
-    tokens = text.split()
-    tokens = [stem(t) for t in tokens if t not in STOP_WORDS and len(t) > 2]
-    return " ".join(tokens)
+    return VIEW.cleaner.clean(text)
 
 # ==========================================
 # 3. DATA LOADERS
 # ==========================================
-data_pool = []
-
-# --- LOAD DAILY DIALOGUE (Acts & Emotions) ---
 # Acts: 1=Inform(Disclosure), 2=Question, 3=Directive, 4=Commissive
-# Emotions: 0=Neutral, 1=Anger, 2=Disgust, ...
-try:
-    print(f"Loading DailyDialogue...")
-    with open(PATH_DD_TXT, 'r', encoding='utf-8') as ft, \
-         open(PATH_DD_ACT, 'r', encoding='utf-8') as fa, \
-         open(PATH_DD_EMO, 'r', encoding='utf-8') as fe:
-        
-        lines_txt = ft.readlines()
-        lines_act = fa.readlines()
-        lines_emo = fe.readlines()
-        
-        for l_t, l_a, l_e in zip(lines_txt, lines_act, lines_emo):
-            parts_t = l_t.strip().split('__eou__')
-            parts_a = l_a.strip().split(' ')
-            parts_e = l_e.strip().split(' ')
-            
-            for t, a, e in zip(parts_t, parts_a, parts_e):
-                if len(t) < 2: continue
-                text = t.strip()
-                
-                # MAP ACTS
-                if a == '1': 
-                    # Act 1 is "Inform", but we want to split it. 
-                    # If it's short & neutral -> Phatic. Else -> Disclosure.
-                    if e == '0' and len(text.split()) < 6:
-                        data_pool.append({'text': text, 'label': 'phatic'})
-                    else:
-                        data_pool.append({'text': text, 'label': 'disclosure'})
-                elif a == '2': data_pool.append({'text': text, 'label': 'question'})
-                elif a == '3': data_pool.append({'text': text, 'label': 'directive'})
-                elif a == '4': data_pool.append({'text': text, 'label': 'commissive'})
-                
-                # MAP EMOTIONS (Override Acts if strong emotion)
-                if e == '1' or e == '2': # Anger or Disgust
-                    data_pool.append({'text': text, 'label': 'conflict'})
-
-except Exception as e:
-    print(f"[ERROR] DailyDialogue Load Failed: {e}")
-
-# --- LOAD PERSONA CHAT (For Disclosure Augmentation) ---
-try:
-    print(f"Loading PersonaChat...")
-    df_p = pd.read_csv(PATH_PERSONA)
-    # The 'Persona' column contains sentences like "I like to hunt." -> Great for Disclosure
-    for _, row in df_p.iterrows():
-        personas = str(row['Persona']).split('.')
-        for p in personas:
-            if len(p) > 5:
-                data_pool.append({'text': p, 'label': 'disclosure'})
-except Exception as e:
-    print(f"[ERROR] PersonaChat Load Failed: {e}")
-
-# ==========================================
-# 4. INJECTION & BALANCING
-# ==========================================
-print(f"Injecting Synthetics...")
-for label, phrases in SYNTHETICS.items():
-    for p in phrases:
-        clean = advanced_clean(p)
-        if clean:
-            for _ in range(SYNTHETIC_AMPLIFICATION):
-                data_pool.append({'text': p, 'label': label})
-
-df_raw = pd.DataFrame(data_pool)
-df_raw['clean_text'] = df_raw['text'].apply(advanced_clean)
-df_raw = df_raw[df_raw['clean_text'].str.len() > 0]
-
-print(f"Balancing Classes ({SAMPLES_PER_CLASS} per class)...")
-balanced_dfs = []
-for target in TARGETS:
-    df_class = df_raw[df_raw['label'] == target]
-    if len(df_class) == 0:
-        print(f"!! WARNING: No data for {target}")
-        continue
-    df_res = resample(df_class, replace=True, n_samples=SAMPLES_PER_CLASS, random_state=42)
-    balanced_dfs.append(df_res)
-
-df_final = pd.concat(balanced_dfs)
-print(f"Final Training Set: {len(df_final)} samples.")
-
-# ==========================================
-# 5. VECTORIZATION & TRAINING
-# ==========================================
-def fnv1a_32_js(text):
-    h = 2166136261
-    for char in text:
-        h ^= ord(char)
-        h = (h * 16777619) & 0xFFFFFFFF
-    return h
-
-def vectorizer_fnv(text_list, hash_size):
-    matrix = np.zeros((len(text_list), hash_size), dtype=np.float32)
-    for i, text in enumerate(text_list):
-        tokens = text.split()
-        for token in tokens:
-            idx = fnv1a_32_js(token) % hash_size
-            matrix[i, idx] += 1
-    return matrix
-
-print("Vectorizing...")
-X = vectorizer_fnv(df_final['clean_text'].tolist(), HASH_SIZE)
-y = df_final['label']
-
-print("Training Gates...")
-models_out = {}
-
-for target in TARGETS:
-    print(f"  Training [{target}]...")
-    y_binary = (y == target).astype(int)
-    clf = LogisticRegression(solver='liblinear', penalty='l2', C=1.0, class_weight='balanced')
-    clf.fit(X, y_binary)
-
-    # Quantize Weights to 8-bit signed integers (-128 to 127) for better precision
-    w = clf.coef_[0]
-
-    # Find the scale to fit weights into -128 to 127 range
-    w_max_abs = np.max(np.abs(w))
-    scale = w_max_abs / 127.0 if w_max_abs > 0 else 1.0
-
-    # Quantize to signed 8-bit integers
-    w_quantized = np.round(w / scale).astype(int)
-    # Clamp to valid range
-    w_quantized = np.clip(w_quantized, -128, 127)
-
-    # Store Metadata
-    models_out[target] = {
-        "bias": clf.intercept_[0],
-        "scale": scale,
-        "weights": w_quantized
-    }
-
-# ==========================================
-# 6. EXPORT (Matching INTENT+v15 Format)
-# ==========================================
-print("Exporting to JS...")
+# Act 1 is "Inform", but we want to split it: short & neutral -> 'phatic'.
+DD_ACT_MAP = {'1': 'disclosure', '2': 'question', '3': 'directive', '4': 'commissive', 'phatic': 'phatic'}
+# Emotions: 0=Neutral, 1=Anger, 2=Disgust, ... (Anger or Disgust also -> conflict)
+DD_EMO_MAP = {'1': 'conflict', '2': 'conflict'}
+
+SOURCES = [PATH_DD_TXT, PATH_DD_ACT, PATH_DD_EMO, PATH_PERSONA]
+# Everything besides SOURCES that shapes the cleaned corpus
+CORPUS_CONFIG = (stem, STOP_WORDS, advanced_clean, DD_ACT_MAP, DD_EMO_MAP)
+
+def label_daily_dialogue(dd):
+    # read_daily_dialogue() rows -> [act frame, emotion frame]
+    dd = dd[dd['text'].str.len() >= 2]
+    text = dd['text'].str.strip()
+
+    # MAP ACTS
+    is_phatic = (dd['act'] == '1') & (dd['emotion'] == '0') & (text.str.split().str.len() < 6)
+    acts = dd['act'].mask(is_phatic, 'phatic')
+
+    # MAP EMOTIONS (Override Acts if strong emotion)
+    return [map_labels(text, acts, DD_ACT_MAP, "dailydialog"),
+            map_labels(text, dd['emotion'], DD_EMO_MAP, "dailydialog")]
+
+def load_real_corpus(dd_txt=PATH_DD_TXT, dd_act=PATH_DD_ACT, dd_emo=PATH_DD_EMO,
+                     persona=PATH_PERSONA):
+    frames = []
+
+    # --- LOAD DAILY DIALOGUE (Acts & Emotions) ---
+    try:
+        print(f"Loading DailyDialogue...")
+        frames.extend(label_daily_dialogue(read_daily_dialogue(dd_txt, dd_act, dd_emo)))
+    except Exception as e:
+        print(f"[ERROR] DailyDialogue Load Failed: {e}")
+
+    # --- LOAD PERSONA CHAT (For Disclosure Augmentation) ---
+    try:
+        if persona:
+            print(f"Loading PersonaChat...")
+            # The 'Persona' column contains sentences like "I like to hunt." -> Great for Disclosure
+            frames.append(load_persona_chat(persona, 'disclosure'))
+    except Exception as e:
+        print(f"[ERROR] PersonaChat Load Failed: {e}")
+
+    df_real = concat_labeled(frames)
+    df_real['clean_text'] = VIEW.clean(df_real['text'], n_jobs=N_JOBS)
+    return df_real[df_real['clean_text'].str.len() > 0]
+
+def stream_real_corpus(chunk_rows=STREAM_CHUNK_ROWS):
+    # load_real_corpus() a chunk at a time (DailyDialogue: chunk_rows dialogues)
+    streams = [
+        ("DailyDialogue", (f for dd in iter_daily_dialogue(PATH_DD_TXT, PATH_DD_ACT, PATH_DD_EMO, chunk_rows)
+                           for f in label_daily_dialogue(dd))),
+        ("PersonaChat", iter_persona_chat(PATH_PERSONA, 'disclosure', chunk_rows)),
+    ]
+    for name, stream in streams:
+        try:
+            for df in stream:
+                df['clean_text'] = VIEW.clean_chunk(df['text'], n_jobs=N_JOBS)
+                yield df[df['clean_text'].str.len() > 0]
+        except Exception as e:
+            print(f"[FAILED] {name}: {e}")
+
+def stream_training_rows():
+    # synthetics first, then every real corpus row (no balancing)
+    df_synth = load_synthetics(SYNTHETICS, keep=advanced_clean, weight=SYNTHETIC_AMPLIFICATION)
+    df_synth['clean_text'] = VIEW.cleaner.clean_many(df_synth['text'])
+    yield df_synth
+    yield from stream_real_corpus()
+
+def load_heldout_corpus(split="dev"):
+    # Same labelling on the DailyDialogue validation or test split (PersonaChat has none)
+    if split == "test":
+        return load_real_corpus(dd_txt=PATH_DD_TXT_TEST, dd_act=PATH_DD_ACT_TEST,
+                                dd_emo=PATH_DD_EMO_TEST, persona=None)
+    return load_real_corpus(dd_txt=PATH_DD_TXT_DEV, dd_act=PATH_DD_ACT_DEV,
+                            dd_emo=PATH_DD_EMO_DEV, persona=None)
 
 # Map Python target names to JS model variable names
 TARGET_TO_MODEL_NAME = {
@@ -305,32 +268,151 @@ TARGET_TO_MODEL_NAME = {
     "narrative": "MODEL_NARRATIVE"
 }
 
-js_out = "// EIDOS INTENT ENGINE (DailyDialogue + PersonaChat)\n"
-js_out += "// Paste these model strings into INTENT+v15 (No Weights).js\n"
-js_out += "// in the EIDOS_MODELS section\n\n"
-js_out += f"var HASH_SIZE = {HASH_SIZE};\n"
-
-for target, data in models_out.items():
-    model_name = TARGET_TO_MODEL_NAME.get(target, f"MODEL_{target.upper()}")
-
-    # Format: "b:BIAS;s:SCALE;w:W1,W2,W3,..."
-    bias = data['bias']
-    scale = data['scale']
-    weights_str = ",".join(str(w) for w in data['weights'])
-
-    model_string = f"b:{bias};s:{scale};w:{weights_str}"
-
-    js_out += f'var {model_name} = "{model_string}"\n'
-
-js_out += "\n// Copy the above variables into your INTENT+v15 (No Weights).js file\n"
-js_out += "// Replace the empty string placeholders in the //#region EIDOS_MODELS section\n"
-
-with open("EIDOS_Sister_Script.js", "w") as f:
-    f.write(js_out)
 
-print("DONE. File saved as 'EIDOS_Sister_Script.js'.")
-print("\nTo use these models:")
-print("1. Open EIDOS_Sister_Script.js")
-print("2. Copy all the MODEL_* variable definitions")
-print("3. Paste them into INTENT+v15 (No Weights).js in the EIDOS_MODELS section")
-print("   (Replace the empty string placeholders)")
\ No newline at end of file
+def build_training_counts(use_index=True):
+    # -> (df_final, X_counts, sample_weight)
+    # use_index=False: hash without the persisted feature index (one-off HASH_SIZEs)
+    # ==========================================
+    # 4. INJECTION & BALANCING
+    # ==========================================
+    df_real = cached_corpus("eidos", SOURCES, config=CORPUS_CONFIG, build=load_real_corpus)
+
+    # Token -> bucket index of the real corpora (memory-mapped when warm)
+    feature_index = None
+    if use_index:
+        feature_index = open_feature_index(
+            "eidos", df_real['clean_text'], sources=SOURCES,
+            hash_size=HASH_SIZE, bigrams=VIEW.bigrams, config=(stem, STOP_WORDS, advanced_clean))
+
+    print(f"Injecting Synthetics...")
+    df_synth = load_synthetics(SYNTHETICS, keep=advanced_clean, weight=SYNTHETIC_AMPLIFICATION)
+    df_synth['clean_text'] = VIEW.cleaner.clean_many(df_synth['text'])
+
+    df_raw = pd.concat([df_real.assign(weight=1.0), df_synth], ignore_index=True)
+
+    print(f"Balancing Classes ({SAMPLES_PER_CLASS} per class)...")
+    df_final = balance_classes(df_raw, TARGETS, SAMPLES_PER_CLASS)
+    sample_weight = df_final['weight'].to_numpy()
+    print(f"Final Training Set: {len(df_final)} rows ({sample_weight.sum():.0f} weighted samples).")
+
+    # ==========================================
+    # 5. VECTORIZATION & TRAINING
+    # ==========================================
+    print("Vectorizing...")
+    X = VIEW.hash(df_final['clean_text'], index=feature_index, n_jobs=N_JOBS)
+    return df_final, X, sample_weight
+
+
+def vectorize(X_counts, sample_weight):
+    # hashed counts -> training matrix (raw counts, like the runtime's sum)
+    return X_counts
+
+
+def build_training_set(use_index=True):
+    # -> (df_final, X, sample_weight)
+    df_final, X_counts, sample_weight = build_training_counts(use_index)
+    return df_final, vectorize(X_counts, sample_weight), sample_weight
+
+
+def render_blob(fits, fmt=None, c=None):
+    # {target: (coef, intercept)} -> EIDOS_Sister_Script.js text; c: {target: searched C}
+    models_out = {}
+
+    for target in TARGETS:
+        # Quantize Weights to 8-bit signed integers (-128 to 127) for better precision
+        w, intercept = fits[target]
+        if QUANTIZER != "int8":
+            # 4-bit codes from the float weights (q:), with their own step
+            step, w_str = quant_field(w, QUANTIZER, sep=":")
+            models_out[target] = {"bias": intercept, "scale": step, "field": w_str}
+            continue
+
+        # Find the scale to fit weights into -128 to 127 range
+        w_max_abs = np.max(np.abs(w))
+        scale = w_max_abs / 127.0 if w_max_abs > 0 else 1.0
+
+        # Quantize to signed 8-bit integers
+        w_quantized = np.round(w / scale).astype(int)
+        # Clamp to valid range
+        w_quantized = np.clip(w_quantized, -128, 127)
+
+        # Store Metadata
+        models_out[target] = {
+            "bias": intercept,
+            "scale": scale,
+            "weights": w_quantized
+        }
+
+    # ==========================================
+    # 6. EXPORT (Matching INTENT+v15 Format)
+    # ==========================================
+    js_out = "// EIDOS INTENT ENGINE (DailyDialogue + PersonaChat)\n"
+    js_out += "// Paste these model strings into INTENT+v15 (No Weights).js\n"
+    js_out += "// in the EIDOS_MODELS section\n\n"
+    js_out += f"var HASH_SIZE = {HASH_SIZE};\n"
+
+    for target, data in models_out.items():
+        model_name = TARGET_TO_MODEL_NAME.get(target, f"MODEL_{target.upper()}")
+
+        # Format: "b:BIAS;s:SCALE[;c:C];w:W1,W2,W3,..." (or "p:PACKED" / "d:SPARSE")
+        bias = data['bias']
+        scale = data['scale']
+        weights_str = data.get('field') or weights_field(data['weights'], fmt=fmt or WEIGHT_FORMAT, sep=":",
+                                                         threshold=SPARSE_THRESHOLD)
+
+        model_string = f"b:{bias};s:{scale}{c_field((c or {}).get(target), sep=':')};{weights_str}"
+
+        js_out += f'var {model_name} = "{model_string}"\n'
+
+    js_out += "\n// Copy the above variables into your INTENT+v15 (No Weights).js file\n"
+    js_out += "// Replace the empty string placeholders in the //#region EIDOS_MODELS section\n"
+    return js_out
+
+
+def train_models():
+    # balanced in-RAM training set -> ({target: (coef, intercept)}, {target: C} or None)
+    df_final, X, sample_weight = build_training_set()
+    y = df_final['label']
+
+    params, best_c = TRAIN_PARAMS, None
+    if SPARSE_BUDGET:
+        params = SPARSE_PARAMS
+    elif C_SEARCH:
+        best_c, _ = search_c(X, y, TARGETS, sample_weight, TRAIN_PARAMS, C_PATH,
+                             n_folds=CV_FOLDS, n_jobs=N_JOBS, joint=JOINT_TRAINING)
+        print("C per target: " + ", ".join(f"{t}={c:g}" for t, c in best_c.items()))
+        params = dict(TRAIN_PARAMS, C=best_c)
+
+    print("Training Gates...")
+    run_key = config_digest([file_digest(p) for p in SOURCES], load_real_corpus, *CORPUS_CONFIG,
+                            HASH_SIZE, SAMPLES_PER_CLASS, SYNTHETIC_AMPLIFICATION, params, SPARSE_BUDGET)
+    fits = update_specialists("eidos", run_key, X, y, TARGETS, sample_weight,
+                              params, SYNTHETICS, incremental=INCREMENTAL,
+                              n_jobs=N_JOBS, joint=JOINT_TRAINING, budget=SPARSE_BUDGET)
+    return fits, best_c
+
+
+def main():
+    best_c = None
+    if STREAMING:
+        print("Streaming Gates...")
+        fits = train_streaming(stream_training_rows(), TARGETS, VIEW, epochs=STREAM_EPOCHS)
+    else:
+        fits, best_c = train_models()
+
+    print("Exporting to JS...")
+    js_out = render_blob(fits, fmt="sparse" if SPARSE_BUDGET else None, c=best_c)
+
+    with open("EIDOS_Sister_Script.js", "w") as f:
+        f.write(js_out)
+
+    print("DONE. File saved as 'EIDOS_Sister_Script.js'.")
+    print("\nTo use these models:")
+    print("1. Open EIDOS_Sister_Script.js")
+    print("2. Copy all the MODEL_* variable definitions")
+    print("3. Paste them into INTENT+v15 (No Weights).js in the EIDOS_MODELS section")
+    print("   (Replace the empty string placeholders)")
+    return fits
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import importlib
+import sys
+
+import numpy as np
+
+from heldout_eval import ENGINES, blob_scorer, f1_stats, float_heads, heldout_split, train_float
+from specialist_export import QUANTIZERS, WEIGHT_FORMATS
+
+# ==========================================
+# QUANTIZERS vs THE FLOAT MODEL
+# ==========================================
+# Usage: python quant_report.py [aura|eros|eidos ...]
+# Trains the engine's specialists once, then renders the blob with every
+# quantizer: int8 in each WEIGHT_FORMAT, then the 4-bit QUANTIZERS (see
+# specialist_export.quantize). Each blob is scored on the dev split with the
+# runtime tokenization and compared with the float weights under the same
+# tokenization:
+#   bytes   blob size
+#   flips   share of head decisions (BlobScorer.fire) that differ from float
+#   dF1     mean held-out F1 change against float
+#   err     mean |score - float score| over messages and heads
+SPLIT = "dev"
+
+
+def main(*engines):
+    for engine in engines or tuple(ENGINES):
+        module_name, targets_name = ENGINES[engine]
+        creator = importlib.import_module(module_name)
+        targets = getattr(creator, targets_name)
+        models = train_float(creator, targets)
+        texts, _, labels = heldout_split(creator, targets, SPLIT)
+
+        variants = [("int8", fmt) for fmt in WEIGHT_FORMATS] + [(q, None) for q in QUANTIZERS[1:]]
+        shipped = creator.QUANTIZER
+        rows = []
+        try:
+            for quantizer, fmt in variants:
+                creator.QUANTIZER = quantizer
+                scorer, size = blob_scorer(engine, creator, models, fmt=fmt)
+                cols, head_targets, coef, intercept = float_heads(creator, scorer, targets, models)
+                if not cols:
+                    break
+                X = scorer.featurize(texts)[0]
+                exact = np.asarray(X @ coef) + intercept
+                scores = scorer.scores(texts)
+                fired, fired_exact = scorer.fire(scores)[:, cols], scorer.fire(exact)[:, cols]
+                y = labels[:, [targets.index(t) for t in head_targets]]
+                d_f1 = f1_stats(fired, y)[2] - f1_stats(fired_exact, y)[2]
+                rows.append((quantizer if fmt is None else f"int8 {fmt}", size,
+                             float((fired != fired_exact).mean()), float(d_f1.mean()),
+                             float(np.abs(scores[:, cols] - exact[:, cols]).mean())))
+        finally:
+            creator.QUANTIZER = shipped
+        if not rows:
+            print(f"{engine.upper()}: no trained models to report")
+            continue
+
+        print(f"\n--- {engine.upper()} {SPLIT}: {len(texts)} messages, vs float weights ---")
+        print(f"{'quantizer':<14}{'bytes':>9}{'flips':>8}{'dF1':>9}{'err':>10}")
+        for name, size, flips, d_f1, err in rows:
+            print(f"{name:<14}{size:>9}{flips:>8.2%}{d_f1:>+9.4f}{err:>10.5f}")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
@@ -0,0 +1,243 @@
+import re
+import sys
+import time
+
+import numpy as np
+from scipy import sparse
+
+from fnv_hash import FnvBucketCache
+from specialist_export import parse_model, read_blob
+
+# ==========================================
+# RUNTIME TOKENIZATION (Python port)
+# ==========================================
+# Mirrors the JS engines exactly: _normalizeText -> split(' ') -> keep
+# tokens with length > 2 that are not in STOP_STR -> stem -> append "a b"
+# bigrams. This is NOT advanced_clean(): the runtime turns punctuation into
+# spaces ("don't" -> "don t") where the creators delete it ("dont").
+#
+# JS `\s` is spelled out because Python's `\s` is a different set (it has
+# \x1c-\x1f and \x85, and lacks \ufeff).
+JS_SPACE = "\t\n\x0b\x0c\r \xa0\u1680\u2000-\u200a\u2028\u2029\u202f\u205f\u3000\ufeff"
+NON_RUNTIME = re.compile(f"[^a-z0-9_{JS_SPACE}-]")
+DASHES = re.compile(r"[-_]+")
+SPACES = re.compile(f"[{JS_SPACE}]+")
+
+RUNTIME_STOP_STR = "i,me,my,myself,we,our,ours,ourselves,you,your,yours,yourself,yourselves,he,him,his,himself,she,her,hers,herself,it,its,itself,they,them,their,theirs,themselves,what,which,who,whom,this,that,these,those,am,is,are,was,were,be,been,being,have,has,had,having,do,does,did,doing,a,an,the,and,but,if,or,because,as,until,while,of,at,by,for,with,about,against,between,into,through,during,before,after,above,below,to,from,up,down,in,out,on,off,over,under,again,further,then,once,here,there,when,where,why,how,all,any,both,each,few,more,most,other,some,such,no,nor,not,only,own,same,so,than,too,very,s,t,can,will,just,don,should,now"
+RUNTIME_STOP_WORDS = frozenset(RUNTIME_STOP_STR.split(","))
+
+
+def normalize_text(s):
+    # _normalizeText()
+    s = NON_RUNTIME.sub(" ", str(s).lower())
+    s = DASHES.sub(" ", s)
+    return SPACES.sub(" ", s).strip(" ")
+
+
+def runtime_stem(w):
+    # stem() of the JS engines (same suffix order)
+    if len(w) < 4:
+        return w
+    if w.endswith("ies"):
+        return w[:-3] + "y"
+    if w.endswith("es"):
+        return w[:-2]
+    if w.endswith("s") and not w.endswith("ss"):
+        return w[:-1]
+    if w.endswith("ing") and len(w) - 3 > 2:
+        return w[:-3]
+    if w.endswith("ed") and len(w) - 2 > 2:
+        return w[:-2]
+    if w.endswith("ly"):
+        return w[:-2]
+    if w.endswith("ment"):
+        return w[:-4]
+    if w.endswith("ness"):
+        return w[:-4]
+    if w.endswith("ful"):
+        return w[:-3]
+    if w.endswith("able"):
+        return w[:-4]
+    if w.endswith("ibility"):
+        return w[:-7]
+    return w
+
+
+class _RuntimeTokenCache(dict):
+    # raw normalized token -> stemmed token, or None when dropped
+    def __missing__(self, t):
+        out = runtime_stem(t) if len(t) > 2 and t not in RUNTIME_STOP_WORDS else None
+        self[t] = out
+        return out
+
+
+_RUNTIME_TOKENS = _RuntimeTokenCache()
+
+
+def runtime_tokens(text):
+    # -> allTokens of the runtime (unigrams, then bigrams)
+    get = _RUNTIME_TOKENS.__getitem__
+    tokens = [t for t in map(get, normalize_text(text).split(" ")) if t is not None]
+    return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+
+# ==========================================
+# ENGINE DECISIONS
+# ==========================================
+# What each engine's main block does with the scores:
+#   argmax   -> (models, context key per model, confidence, skipped winner):
+#               first strictly greater score wins, starting from -999; the
+#               winner is set when 1/(1+exp(-score)) > confidence.
+#   triggers -> (model, context key): checkTrigger, fires when score > 0.
+#   modulus  -> bucket = fnv1a32 % modulus (None: the blob's HASH_SIZE).
+ENGINES = {
+    "aura": dict(
+        blob="specialist_blob_synth.js", modulus=16384,
+        argmax=(["MODEL_ANGER", "MODEL_JOY", "MODEL_SADNESS", "MODEL_FEAR", "MODEL_ROMANCE", "MODEL_NEUTRAL"],
+                ["anger", "joy", "sadness", "fear", "romance", "neutral"], 0.55, "neutral"),
+        triggers=[("MODEL_POSITIVE", "positive"), ("MODEL_NEGATIVE", "negative"),
+                  ("MODEL_CONFUSION", "confusion")]),
+    "eros": dict(
+        blob="EROS_Sister_Script.js", modulus=None, argmax=None,
+        triggers=[(f"MODEL_{k.upper()}", k) for k in
+                  ["platonic", "tension", "romance", "physical", "passion", "explicit", "conflict", "aftercare"]]),
+    "eidos": dict(
+        blob="EIDOS_Sister_Script.js", modulus=None, argmax=None,
+        triggers=[(f"MODEL_{k.upper()}", k) for k in
+                  ["question", "disclosure", "command", "promise", "conflict", "smalltalk", "meta", "narrative"]]),
+}
+MISSING_SCORE = -999.0  # solve*() of an empty model string
+EXACT_MARGIN = 1e-6  # decisions closer than this are re-scored token by token
+
+
+class BlobScorer:
+    """Batch scorer for one exported engine blob (csv, packed or sparse).
+
+    Scores come from one CSR (messages x buckets) x (buckets x models)
+    product: bias + scale * (sum of int weights). The runtime instead adds
+    w * scale one token at a time, which can round differently in the last
+    bits, so any message whose decision is within EXACT_MARGIN of a
+    threshold (0 for triggers, the confidence logit or the runner-up for the
+    argmax) is re-scored in runtime order. Decisions are then the runtime's
+    bit for bit.
+    """
+
+    def __init__(self, engine, path=None, modulus=None):
+        self.engine = engine
+        self.spec = ENGINES[engine]
+        path = path or self.spec["blob"]
+        with open(path, "r", encoding="utf-8") as f:
+            declared = re.search(r'var HASH_SIZE = (\d+)', f.read())
+        blob_size = int(declared.group(1)) if declared else 16384
+        # modulus: override the runtime's % (e.g. a build at another HASH_SIZE)
+        self.modulus = modulus or self.spec["modulus"] or blob_size
+
+        models = read_blob(path)
+        self.names = [name for name, _ in self.spec["triggers"]]
+        if self.spec["argmax"]:
+            self.names = self.spec["argmax"][0] + self.names
+        self.present = np.array([name in models for name in self.names])
+        self.bias = np.full(len(self.names), MISSING_SCORE)
+        self.scale = np.zeros(len(self.names))
+        # buckets >= len(w) are skipped by the runtime (h < nWeights): zero rows.
+        # Integer weights held as float64 so the product never converts them.
+        self.weights = np.zeros((self.modulus, len(self.names)), dtype=np.float64)
+        for k, name in enumerate(self.names):
+            if name in models:
+                self.bias[k], self.scale[k], w = parse_model(models[name], size=blob_size)
+                n = min(len(w), self.modulus)
+                self.weights[:n, k] = w[:n]
+        self.cache = FnvBucketCache()
+
+    def featurize(self, texts):
+        # -> (CSR counts, flat bucket ids in runtime order, row offsets)
+        token_lists = [runtime_tokens(t) for t in texts]
+        lengths = np.fromiter(map(len, token_lists), dtype=np.int64, count=len(token_lists))
+        indptr = np.zeros(len(token_lists) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        flat = [t for tokens in token_lists for t in tokens]
+        buckets = self.cache.buckets(flat, self.modulus)
+        X = sparse.csr_matrix((np.ones(len(buckets)), buckets, indptr),
+                              shape=(len(token_lists), self.modulus))
+        X.sum_duplicates()
+        return X, buckets, indptr
+
+    def _exact(self, buckets, indptr, rows):
+        # runtime order: score = bias; score += w * scale per token
+        out = np.empty((len(rows), len(self.names)))
+        for i, r in enumerate(rows):
+            score = self.bias.copy()
+            for h in buckets[indptr[r]:indptr[r + 1]].tolist():
+                score += self.weights[h] * self.scale
+            out[i] = score
+        return out
+
+    def scores(self, texts):
+        # -> (n_messages, n_models) runtime scores, in self.names order
+        X, buckets, indptr = self.featurize(texts)
+        sums = np.asarray(X @ self.weights)
+        scores = self.bias + self.scale * sums
+        scores[:, ~self.present] = MISSING_SCORE
+
+        near = np.zeros(len(scores), dtype=bool)
+        n_argmax = 0
+        if self.spec["argmax"]:
+            names, _, confidence, _ = self.spec["argmax"]
+            n_argmax = len(names)
+            head = np.sort(scores[:, :n_argmax], axis=1)
+            logit = np.log(confidence / (1 - confidence))
+            near |= head[:, -1] - head[:, -2] < EXACT_MARGIN
+            near |= np.abs(head[:, -1] - logit) < EXACT_MARGIN
+        near |= (np.abs(scores[:, n_argmax:]) < EXACT_MARGIN).any(axis=1)
+        rows = np.flatnonzero(near)
+        if len(rows):
+            exact = self._exact(buckets, indptr, rows)
+            exact[:, ~self.present] = MISSING_SCORE
+            scores[rows] = exact
+        return scores
+
+    def fire(self, scores, ran=None):
+        # (n_messages, n_models) scores -> bool decisions, self.names order, as
+        # the engine's main block takes them: argmax + confidence for the
+        # argmax models (the skipped winner never fires), score > 0 for triggers
+        ran = np.ones(len(scores), dtype=bool) if ran is None else ran
+        fired = np.zeros(scores.shape, dtype=bool)
+        n_argmax = 0
+        if self.spec["argmax"]:
+            names, keys, confidence, skipped = self.spec["argmax"]
+            n_argmax = len(names)
+            head = scores[:, :n_argmax]
+            best = head.argmax(axis=1)  # first maximum, like the strict '>' loop
+            max_score = head[np.arange(len(head)), best]
+            winner = max_score > MISSING_SCORE
+            conf = 1 / (1 + np.exp(-max_score))
+            for k, key in enumerate(keys):
+                fired[:, k] = ran & winner & (best == k) & (conf > confidence) & (key != skipped)
+        fired[:, n_argmax:] = ran[:, None] & (scores[:, n_argmax:] > 0.0)
+        return fired
+
+    def keys(self):
+        # context key of each model, self.names order
+        keys = [key for _, key in self.spec["triggers"]]
+        return (self.spec["argmax"][1] + keys) if self.spec["argmax"] else keys
+
+    def decide(self, texts):
+        # -> {context key: bool array} as the engine's main block sets it
+        ran = np.array([bool(t) for t in texts], dtype=bool)  # empty message: nothing runs
+        fired = self.fire(self.scores(texts), ran)
+        return {key: fired[:, k] for k, key in enumerate(self.keys())}
+
+
+if __name__ == "__main__":
+    # python reference_scorer.py [aura|eros|eidos] messages.txt [blob.js]
+    # One message per line; prints how often each decision fires.
+    engine, corpus = sys.argv[1], sys.argv[2]
+    scorer = BlobScorer(engine, sys.argv[3] if len(sys.argv) > 3 else None)
+    with open(corpus, "r", encoding="utf-8") as f:
+        messages = f.read().rstrip("\n").split("\n")
+    start = time.perf_counter()
+    decisions = scorer.decide(messages)
+    elapsed = time.perf_counter() - start
+    print(f"{engine.upper()}: {len(messages)} messages in {elapsed:.2f}s")
+    for key, fired in decisions.items():
+        print(f"  {key:<12}{int(fired.sum()):>8}")
@@ -0,0 +1,84 @@
+import importlib
+import sys
+import time
+
+import numpy as np
+
+from heldout_eval import ENGINES, blob_scorer, f1_stats, float_heads, heldout_split
+from specialist_training import train_specialists
+
+# ==========================================
+# SPARSE SPECIALISTS: SIZE vs HELD-OUT ACCURACY
+# ==========================================
+# Usage: python sparse_budget_report.py [aura|eros|eidos ...]
+# Trains the engine's specialists once with TRAIN_PARAMS (L2, dense) and
+# once per non-zero budget in BUDGETS with SPARSE_PARAMS (L1 / elastic-net,
+# C searched per target, see specialist_training._fit_budget). Every model
+# set is exported in the sparse format (d=) and scored on the dev split
+# with the runtime tokenization. Next to each L1 row, "L2 top-k" keeps the
+# same number of largest |w| of the dense models, which is what the sparse
+# export's SPARSE_THRESHOLD pruning amounts to.
+#   nnz     mean non-zero buckets per trained head
+#   bytes   sparse blob size
+#   acc/F1  mean held-out decision accuracy / F1 over the trained heads,
+#           with the runtime's decisions (BlobScorer.fire)
+BUDGETS = [100, 250, 500, 1000, 2000, 4000]
+SPLIT = "dev"
+
+
+def top_k(models, k):
+    # keep the k largest |w| of every model
+    pruned = {}
+    for target, (coef, intercept) in models.items():
+        coef = coef.copy()
+        coef[np.argsort(np.abs(coef), kind="stable")[:max(len(coef) - k, 0)]] = 0.0
+        pruned[target] = (coef, intercept)
+    return pruned
+
+
+def measure(engine, creator, targets, models, texts, labels):
+    scorer, size = blob_scorer(engine, creator, models, fmt="sparse")
+    cols, head_targets, _, _ = float_heads(creator, scorer, targets, models)
+    if not cols:
+        return None
+    y = labels[:, [targets.index(t) for t in head_targets]]
+    fired = scorer.fire(scorer.scores(texts))[:, cols]
+    nnz = np.mean([np.count_nonzero(models[t][0]) for t in head_targets])
+    return nnz, size, float((fired == y).mean()), float(f1_stats(fired, y)[2].mean())
+
+
+def main(*engines):
+    for engine in engines or tuple(ENGINES):
+        module_name, targets_name = ENGINES[engine]
+        creator = importlib.import_module(module_name)
+        targets = getattr(creator, targets_name)
+        df_final, X, sample_weight = creator.build_training_set()
+        labels_train = df_final['label'].to_numpy(dtype=object)
+        texts, _, labels = heldout_split(creator, targets, SPLIT)
+
+        def train(params, budget=None):
+            start = time.perf_counter()
+            models = train_specialists(X, labels_train, targets, sample_weight, params,
+                                       n_jobs=creator.N_JOBS, budget=budget)
+            return models, time.perf_counter() - start
+
+        dense, dense_s = train(creator.TRAIN_PARAMS)
+        rows = [("L2 dense", dense_s, measure(engine, creator, targets, dense, texts, labels))]
+        for budget in BUDGETS:
+            models, train_s = train(creator.SPARSE_PARAMS, budget)
+            rows.append((f"L1 {budget}", train_s, measure(engine, creator, targets, models, texts, labels)))
+            rows.append((f"L2 top-{budget}", 0.0, measure(engine, creator, targets, top_k(dense, budget),
+                                                           texts, labels)))
+        if rows[0][2] is None:
+            print(f"{engine.upper()}: no trained models to report")
+            continue
+
+        print(f"\n--- {engine.upper()} {SPLIT}: {len(texts)} messages, "
+              f"{creator.SPARSE_PARAMS.get('penalty')} penalty ---")
+        print(f"{'model':<14}{'train s':>8}{'nnz':>8}{'bytes':>9}{'acc':>8}{'F1':>8}")
+        for name, train_s, (nnz, size, acc, f1) in rows:
+            print(f"{name:<14}{train_s:>8.1f}{nnz:>8.0f}{size:>9}{acc:>8.4f}{f1:>8.4f}")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
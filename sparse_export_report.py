@@ -0,0 +1,80 @@
+import importlib
+import sys
+
+import numpy as np
+import pandas as pd
+
+from specialist_export import encode_sparse, parse_model, read_blob
+
+# ==========================================
+# SPARSE EXPORT: SIZE vs HELD-OUT ACCURACY
+# ==========================================
+# Usage: python sparse_export_report.py [aura|eros|eidos] [blob.js]
+# Reads the engine's exported blob, then for each SPARSE_THRESHOLD in
+# THRESHOLDS drops the buckets with |int8 weight| <= threshold and scores the
+# engine's held-out split (dev / validation files, never trained on) the way
+# the runtime does: bias + scale * sum of token weights, fires when > 0.
+# Reports blob size, non-zero buckets, decision accuracy against the held-out
+# labels and the share of decisions that differ from the full model.
+ENGINES = {
+    "aura": ("emotion_creator2", "ALL_TARGETS", "specialist_blob_synth.js"),
+    "eros": ("eros_creator", "TARGETS", "EROS_Sister_Script.js"),
+    "eidos": ("intent_creator", "TARGETS", "EIDOS_Sister_Script.js"),
+}
+THRESHOLDS = [0, 1, 2, 3, 5, 8]
+
+
+def heldout_matrix(creator, targets):
+    # -> (counts CSR, {target: bool labels}) with one row per distinct text
+    df = creator.load_heldout_corpus()
+    df = df[df['label'].isin(targets)]
+    texts = pd.Index(df['clean_text'].unique())
+    rows = texts.get_indexer(df['clean_text'])
+    labels = {}
+    for target in targets:
+        y = np.zeros(len(texts), dtype=bool)
+        y[rows[df['label'].to_numpy() == target]] = True
+        labels[target] = y
+    X = creator.VIEW.hash(texts.to_numpy(dtype=object))
+    return X, labels
+
+
+def model_name(creator, target):
+    names = getattr(creator, "TARGET_TO_MODEL_NAME", {})
+    return names.get(target, f"MODEL_{target.upper()}")
+
+
+def main(engine="aura", blob=None):
+    module_name, targets_name, default_blob = ENGINES[engine]
+    creator = importlib.import_module(module_name)
+    targets = getattr(creator, targets_name)
+    models = read_blob(blob or default_blob)
+    X, labels = heldout_matrix(creator, targets)
+
+    parsed = {}
+    for target in targets:
+        if model_name(creator, target) in models:
+            parsed[target] = parse_model(models[model_name(creator, target)], size=creator.HASH_SIZE)
+    if not parsed:
+        print(f"{blob or default_blob}: no trained {engine.upper()} models to report")
+        return
+    head_chars = sum(len(f"b={b:.4f};s={s:.6f};d=") for b, s, _ in parsed.values())
+    dense = {t: (b + s * (X @ w)) > 0 for t, (b, s, w) in parsed.items()}
+    n_decisions = X.shape[0] * len(parsed)
+
+    print(f"\n--- {engine.upper()}: {len(parsed)} models, {X.shape[0]} held-out texts ---")
+    print(f"{'threshold':>9}{'chars':>10}{'nnz':>9}{'accuracy':>10}{'flipped':>9}")
+    for threshold in THRESHOLDS:
+        chars, nnz, correct, flipped = head_chars, 0, 0, 0
+        for target, (bias, scale, w) in parsed.items():
+            kept = np.where(np.abs(w) > threshold, w, 0)
+            chars += len(encode_sparse(kept))
+            nnz += int(np.count_nonzero(kept))
+            fired = (bias + scale * (X @ kept)) > 0
+            correct += int((fired == labels[target]).sum())
+            flipped += int((fired != dense[target]).sum())
+        print(f"{threshold:>9}{chars:>10}{nnz:>9}{correct / n_decisions:>10.4f}{flipped / n_decisions:>9.2%}")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
@@ -0,0 +1,272 @@
+import base64
+import re
+import sys
+
+import numpy as np
+
+# ==========================================
+# SPECIALIST MODEL STRINGS
+# ==========================================
+# A model string is "b=BIAS;s=SCALE;w=W0,W1,..." (AURA / EROS) or the same
+# with ':' instead of '=' (EIDOS). Weights are the quantized int8 buckets.
+#
+# Packed variant: the "w" field is replaced by "p", holding the int8
+# weights as base64 (one byte per bucket, two's complement):
+#   "b=BIAS;s=SCALE;p=BASE64"
+# The runtime decodes bucket h straight from chars 4*(h//3) .. +3, so it
+# never parses the whole vector.
+#
+# Sparse variant: "d" holds only the non-zero buckets, in ascending order,
+# as base64 of (gap, weight) pairs: gap = bucket - previous bucket (the
+# first counts from -1) as a LEB128 varint, then the int8 weight. Weights
+# with |w| <= threshold are dropped before encoding.
+#   "b=BIAS;s=SCALE;d=BASE64"
+#
+# 4-bit variant: "q" holds one signed nibble (code in -8..7) per bucket and
+# an optional uint8 multiplier per group of G buckets, so the integer weight
+# is code * MULTS[h // G] (just code when G is 0). "h:v" pairs after the
+# codes are outlier buckets whose integer weight v is stored exactly.
+#   "b=BIAS;s=SCALE;q=G,MULTS_BASE64,CODES_BASE64[,h:v,...]"
+# Nibbles are packed two per byte, the even bucket in the low nibble. The
+# float weights are requantized for it (see quantize), so unlike the three
+# formats above it is not a re-encoding of the int8 export.
+#
+# Any of them may carry "c=C" between the scale and the weights: the
+# regularization strength a head was trained with when the creator picked
+# it per target (C_SEARCH). The runtime skips it.
+#   "b=BIAS;s=SCALE;c=C;w=W0,W1,..."
+WEIGHT_FORMATS = ("csv", "packed", "sparse")
+QUANTIZERS = ("int8", "int4", "group", "mixed")
+QUANT_CLIP_PERCENTILE = 99.9  # int4 / mixed: |w| above this percentile saturates
+QUANT_GROUP = 256  # group: buckets per scale multiplier
+QUANT_OUTLIERS = 64  # mixed: largest |w| buckets kept exactly
+MODEL_RE = re.compile(r'var (MODEL_\w+) = "([^"]*)"')
+
+
+def encode_weights(w_int):
+    w = np.asarray(w_int)
+    if w.size and (w.min() < -128 or w.max() > 127):
+        raise ValueError("Packed weights must fit in int8")
+    return base64.b64encode(w.astype(np.int8).tobytes()).decode("ascii")
+
+
+def decode_weights(packed):
+    return np.frombuffer(base64.b64decode(packed), dtype=np.int8).astype(np.int64)
+
+
+def encode_sparse(w_int, threshold=0):
+    w = np.asarray(w_int).flatten()
+    if w.size and (w.min() < -128 or w.max() > 127):
+        raise ValueError("Sparse weights must fit in int8")
+    buckets = np.flatnonzero(np.abs(w) > threshold)
+    out = bytearray()
+    for gap, value in zip(np.diff(buckets, prepend=-1).tolist(), w[buckets].tolist()):
+        while gap >= 0x80:
+            out.append((gap & 0x7F) | 0x80)
+            gap >>= 7
+        out.append(gap)
+        out.append(value & 0xFF)
+    return base64.b64encode(bytes(out)).decode("ascii")
+
+
+def decode_sparse(encoded, size):
+    weights = np.zeros(size, dtype=np.int64)
+    data = base64.b64decode(encoded)
+    bucket, gap, shift, i = -1, 0, 0, 0
+    while i < len(data):
+        b = data[i]
+        gap |= (b & 0x7F) << shift
+        shift += 7
+        if not b & 0x80:
+            bucket += gap
+            weights[bucket] = data[i + 1] - 256 if data[i + 1] > 127 else data[i + 1]
+            gap, shift = 0, 0
+            i += 1
+        i += 1
+    return weights
+
+
+def _clip_step(w, percentile):
+    # quantization step that maps the percentile of the non-zero |w| to 7
+    nonzero = np.abs(w[w != 0])
+    top = np.percentile(nonzero, percentile) if nonzero.size else 0.0
+    return top / 7.0 if top > 0 else 1.0
+
+
+def quantize(w, method="int4", clip=QUANT_CLIP_PERCENTILE, group=QUANT_GROUP, outliers=QUANT_OUTLIERS):
+    """Float weights -> (scale, group size, uint8 multipliers, int4 codes, {bucket: int}).
+
+    int4    one step for all buckets, the top (100 - clip)% of |w| clipped
+    group   one step per `group` buckets: a uint8 multiplier of a common unit
+    mixed   int4 with clipping, plus the `outliers` largest |w| exact
+    The integer weight of bucket h is codes[h] * mults[h // group_size]
+    (codes[h] when group_size is 0), or outliers[h]; score = sum * scale.
+    """
+    w = np.asarray(w, dtype=np.float64).flatten()
+    if method == "int4":
+        step = _clip_step(w, clip)
+        codes = np.clip(np.rint(w / step), -8, 7).astype(np.int64)
+        return step, 0, np.zeros(0, dtype=np.int64), codes, {}
+    if method == "group":
+        n_groups = -(-len(w) // group)
+        padded = np.zeros(n_groups * group)
+        padded[:len(w)] = np.abs(w)
+        steps = padded.reshape(n_groups, group).max(axis=1) / 7.0
+        scale = (steps.max() or 7.0) / 255.0
+        mults = np.clip(np.ceil(steps / scale), 1, 255).astype(np.int64)
+        codes = np.clip(np.rint(w / (np.repeat(mults, group)[:len(w)] * scale)), -8, 7).astype(np.int64)
+        return scale, group, mults, codes, {}
+    if method == "mixed":
+        order = np.argsort(-np.abs(w), kind="stable")
+        kept = order[:outliers][w[order[:outliers]] != 0]
+        rest = w.copy()
+        rest[kept] = 0.0
+        step = _clip_step(rest, clip)
+        scale = step / 255.0
+        codes = np.clip(np.rint(rest / step), -8, 7).astype(np.int64)
+        exact = {int(h): int(np.rint(w[h] / scale)) for h in np.sort(kept)}
+        return scale, len(w), np.array([255], dtype=np.int64), codes, exact
+    raise ValueError(f"Unknown quantizer: {method!r} (expected one of {QUANTIZERS[1:]})")
+
+
+def encode_quant(group, mults, codes, outliers):
+    codes = np.asarray(codes, dtype=np.int64)
+    if codes.size and (codes.min() < -8 or codes.max() > 7):
+        raise ValueError("4-bit codes must fit in -8..7")
+    nibbles = np.zeros(len(codes) + len(codes) % 2, dtype=np.uint8)
+    nibbles[:len(codes)] = codes & 0xF
+    packed = nibbles[0::2] | (nibbles[1::2] << 4)
+    fields = [str(group), base64.b64encode(np.asarray(mults, dtype=np.uint8).tobytes()).decode("ascii"),
+              base64.b64encode(packed.tobytes()).decode("ascii")]
+    return ",".join(fields + [f"{h}:{v}" for h, v in outliers.items()])
+
+
+def split_quant(encoded):
+    # "q" field -> (group, uint8 multipliers, int4 codes, {bucket: int}), as encode_quant takes them
+    group, mults, codes, *outliers = encoded.split(",")
+    packed = np.frombuffer(base64.b64decode(codes), dtype=np.uint8).astype(np.int64)
+    nibbles = np.empty(2 * len(packed), dtype=np.int64)
+    nibbles[0::2], nibbles[1::2] = packed & 0xF, packed >> 4
+    mults = np.frombuffer(base64.b64decode(mults), dtype=np.uint8).astype(np.int64)
+    exact = {int(h): int(v) for h, v in (pair.split(":") for pair in outliers)}
+    return int(group), mults, nibbles - 16 * (nibbles > 7), exact
+
+
+def decode_quant(encoded):
+    group, mults, weights, outliers = split_quant(encoded)
+    if group:
+        weights *= np.repeat(mults, group)[:len(weights)]
+    for h, v in outliers.items():
+        weights[h] = v
+    return weights
+
+
+def quant_field(w, method, sep="="):
+    # Float weights -> (scale, "q=..." weights tail) for the 4-bit quantizers
+    scale, group, mults, codes, outliers = quantize(w, method)
+    return float(scale), f"q{sep}{encode_quant(group, mults, codes, outliers)}"
+
+
+def weights_field(w_int, fmt="csv", sep="=", threshold=0):
+    # The weights tail of a model string: "w=..." (csv), "p=..." (packed) or
+    # "d=..." (sparse, dropping |w| <= threshold).
+    if fmt == "packed":
+        return f"p{sep}{encode_weights(w_int)}"
+    if fmt == "sparse":
+        return f"d{sep}{encode_sparse(w_int, threshold)}"
+    if fmt != "csv":
+        raise ValueError(f"Unknown weight format: {fmt!r} (expected one of {WEIGHT_FORMATS})")
+    return f"w{sep}" + ",".join(map(str, np.asarray(w_int).flatten()))
+
+
+def parse_model(model_str, size=16384):
+    """Model string -> (bias, scale, int64 weights); any format, either separator.
+
+    A "c" field is accepted and left out (see model_c).
+
+    `size` (HASH_SIZE) is only needed for sparse models, which do not store it.
+    """
+    fields = {}
+    for part in model_str.split(";"):
+        key, value = part[0], part[2:]
+        if key not in "bscwpdq":
+            raise ValueError(f"Unknown model string field: {part[:20]!r}")
+        fields[key] = value
+    if "p" in fields:
+        weights = decode_weights(fields["p"])
+    elif "d" in fields:
+        weights = decode_sparse(fields["d"], size)
+    elif "q" in fields:
+        weights = decode_quant(fields["q"])
+    elif fields.get("w"):
+        weights = np.array(fields["w"].split(","), dtype=np.int64)
+    else:
+        weights = np.zeros(0, dtype=np.int64)
+    return float(fields["b"]), float(fields["s"]), weights
+
+
+def model_c(model_str):
+    # The "c" field of a model string (float), or None when it has none.
+    for part in model_str.split(";"):
+        if part[0] == "c":
+            return float(part[2:])
+    return None
+
+
+def c_field(c, sep="="):
+    # ";c=C" to put after the scale of a model string, or "" without a C
+    return "" if c is None else f";c{sep}{float(c)!r}"
+
+
+def read_blob(path):
+    # {"MODEL_X": model string} for every non-empty model in a .js blob.
+    with open(path, "r", encoding="utf-8") as f:
+        return {name: s for name, s in MODEL_RE.findall(f.read()) if s}
+
+
+def weights_kind(model_str):
+    # -> (kind of the weights field: "w", "p", "d" or "q", its index among the ";" fields)
+    for i, part in enumerate(model_str.split(";")):
+        if part[0] in "wpdq":
+            return part[0], i
+    raise ValueError(f"Model string has no weights field: {model_str[:40]!r}")
+
+
+def round_trip(path, size=16384):
+    # Re-export every model of a blob in its own format, then re-encode it in
+    # each int8 format and back. 4-bit (q=) models are re-packed from their
+    # codes, and go through the int8 formats only when their weights fit.
+    # -> (n_models, {fmt: total model-string chars})
+    models = read_blob(path)
+    sizes = dict.fromkeys(WEIGHT_FORMATS, 0)
+    kinds = {"w": "csv", "p": "packed", "d": "sparse"}
+    for name, model_str in models.items():
+        bias, scale, weights = parse_model(model_str, size=size)
+        sep = model_str[1]
+        kind, i = weights_kind(model_str)
+        fields = model_str.split(";")
+        field = fields[i][2:]
+        if kind == "q":
+            same = encode_quant(*split_quant(field)) == field
+        else:
+            same = weights_field(weights, fmt=kinds[kind], sep=sep)[2:] == field
+        if not same:
+            raise AssertionError(f"{path}: {name} does not re-export identically")
+        if weights.size and (weights.min() < -128 or weights.max() > 127):
+            continue
+        for fmt in WEIGHT_FORMATS:
+            encoded = ";".join(fields[:i] + [weights_field(weights, fmt=fmt, sep=sep)] + fields[i + 1:])
+            b2, s2, w2 = parse_model(encoded, size=len(weights))
+            if (b2, s2) != (bias, scale) or not np.array_equal(w2, weights):
+                raise AssertionError(f"{path}: {name} does not survive the {fmt} format")
+            sizes[fmt] += len(encoded)
+    return len(models), sizes
+
+
+if __name__ == "__main__":
+    # python specialist_export.py [blob.js ...]: round-trip check of every format
+    paths = sys.argv[1:] or ["specialist_blob_synth.js", "EROS_Sister_Script.js", "EIDOS_Sister_Script.js"]
+    for path in paths:
+        n, sizes = round_trip(path)
+        report = ", ".join(f"{fmt} {size}" for fmt, size in sizes.items())
+        print(f"{path}: {n} models OK ({report} chars)")
@@ -0,0 +1,460 @@
+import json
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.optimize import minimize
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import normalize
+
+from build_cache import config_digest, entry_dir, prune_stale
+
+# ==========================================
+# SHARED TRAINING HELPERS
+# ==========================================
+# Rows carry a 'weight' column: 1 for corpus rows, SYNTHETIC_AMPLIFICATION
+# for a synthetic phrase that stands for that many identical copies.
+
+
+def balance_classes(df, targets, n_samples, random_state=42):
+    """Balance every target to `n_samples` worth of weight.
+
+    Corpus rows (weight 1) are resampled with replacement, like
+    sklearn's resample(). Weighted rows are not drawn: each is kept once
+    with the weight its copies would get on average from that draw,
+    n_samples * weight / class_weight_total. Expected per-row weights
+    therefore match resampling the fully duplicated pool.
+
+    Duplicates are collapsed on the way out: every distinct
+    (label, clean_text) appears once, its weight being the number of
+    times it was drawn (plus any kept weight).
+    """
+    chunks = []
+    for target in targets:
+        df_class = df[df['label'] == target]
+        if len(df_class) == 0:
+            print(f"WARNING: No data found for {target}")
+            continue
+        w = df_class['weight'].to_numpy(dtype=np.float64)
+        mass = w.sum()
+        drawn = w == 1
+
+        n_draw = int(round(n_samples * w[drawn].sum() / mass))
+        rng = np.random.RandomState(random_state)
+        draws = rng.randint(0, drawn.sum(), size=n_draw) if n_draw else np.zeros(0, dtype=int)
+        multiplicity = np.bincount(draws, minlength=drawn.sum())
+        picked = multiplicity > 0
+        df_drawn = df_class[drawn][picked].assign(weight=multiplicity[picked].astype(np.float64))
+        df_kept = df_class[~drawn].assign(weight=n_samples * w[~drawn] / mass)
+        chunks.extend([df_drawn, df_kept])
+    return collapse_duplicates(pd.concat(chunks))
+
+
+def collapse_duplicates(df):
+    # One row per distinct (label, clean_text); weights are summed.
+    weight = df.groupby(['label', 'clean_text'], sort=False, observed=True)['weight'].transform('sum')
+    first = ~df.duplicated(['label', 'clean_text']).to_numpy()
+    return df[first].assign(weight=weight.to_numpy()[first])
+
+
+def weighted_tfidf(X, sample_weight):
+    """TF-IDF (l2, smooth idf) where a row of weight k counts as k documents.
+
+    Same formula as TfidfTransformer(norm='l2', use_idf=True,
+    smooth_idf=True), which has no sample_weight of its own.
+    """
+    w = np.asarray(sample_weight, dtype=np.float64)
+    doc_freq = (X > 0).T.astype(np.float64) @ w
+    n_docs = w.sum()
+    idf = np.log((1 + n_docs) / (1 + doc_freq)) + 1
+    return normalize(X @ sparse.diags(idf), norm='l2'), idf
+
+
+# ==========================================
+# PER-TARGET SPECIALIST TRAINING
+# ==========================================
+# Worker processes attach to one copy of the training matrix: its CSR
+# arrays are written once as .npy files and memory-mapped read-only by
+# every worker (nothing is pickled per task except the target code).
+_SHARED = {}
+
+
+def _share(directory, X, label_codes, sample_weight):
+    X = sparse.csr_matrix(X, dtype=np.float64, copy=True)
+    # Canonical (sorted, deduplicated) up front: the workers' arrays are
+    # read-only, so sklearn cannot sort them in place.
+    X.sum_duplicates()
+    arrays = {"data": X.data, "indices": X.indices, "indptr": X.indptr,
+              "labels": label_codes, "sample_weight": sample_weight}
+    for name, arr in arrays.items():
+        np.save(os.path.join(directory, f"{name}.npy"), arr)
+    return X.shape
+
+
+def _attach(directory, shape):
+    def load(name):
+        return np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+    _SHARED["X"] = sparse.csr_matrix((load("data"), load("indices"), load("indptr")),
+                                     shape=shape, copy=False)
+    _SHARED["labels"] = load("labels")
+    _SHARED["sample_weight"] = load("sample_weight")
+    if os.path.isfile(os.path.join(directory, "folds.npy")):
+        _SHARED["folds"] = load("folds")
+
+
+def _fit_one(X, y, sample_weight, params):
+    clf = LogisticRegression(**params)
+    clf.fit(X, y.astype(int), sample_weight=sample_weight)
+    return clf.coef_[0].copy(), float(clf.intercept_[0])
+
+
+def _fit_target(task):
+    code, params = task
+    return _fit_one(_SHARED["X"], _SHARED["labels"] == code, _SHARED["sample_weight"], params)
+
+
+def train_specialists(X, labels, targets, sample_weight, params, n_jobs=1, joint=False, budget=None):
+    """Fit one binary LogisticRegression(**params) per target.
+
+    Returns {target: (coef, intercept)} in `targets` order. With
+    n_jobs > 1 the targets are fitted concurrently in a process pool over
+    a memory-mapped copy of X. Serial and parallel runs read the same
+    float64 arrays and liblinear gets a fixed seed, so both produce
+    identical coefficients.
+
+    joint=True solves every head in one pass instead (see
+    train_specialists_joint); only C and class_weight are used then.
+    params["C"] may be a {target: C} dict (see search_c).
+
+    budget=N fits sparse specialists instead: params should carry an L1 or
+    elastic-net penalty, and C is picked per target along SPARSE_C_PATH so
+    that at most N weights are non-zero (see _fit_budget).
+    """
+    if joint:
+        if params.get("penalty", "l2") != "l2" or budget:
+            raise ValueError("Joint training only supports penalty='l2'")
+        return train_specialists_joint(X, labels, targets, sample_weight,
+                                       C=target_c(params, targets),
+                                       class_weight=params.get("class_weight"))
+    params = dict(params)
+    params.setdefault("random_state", 0)
+    codes, uniques = pd.factorize(np.asarray(labels, dtype=object))
+    lookup = {label: i for i, label in enumerate(uniques)}
+    tasks = [(lookup.get(t, -1), dict(params, C=c)) for t, c in zip(targets, target_c(params, targets))]
+    fit = _fit_target
+    if budget:
+        tasks = [(code, params, budget) for code, params in tasks]
+        fit = _fit_budget
+    weights = np.asarray(sample_weight, dtype=np.float64)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        shape = _share(tmp, X, codes, weights)
+        n_jobs = min(n_jobs or 1, len(targets))
+        if n_jobs <= 1:
+            _attach(tmp, shape)
+            results = []
+            for target, task in zip(targets, tasks):
+                print(f"Training [{target}]...")
+                results.append(fit(task))
+            _SHARED.clear()
+        else:
+            print(f"Training {len(targets)} specialists on {n_jobs} processes...")
+            with ProcessPoolExecutor(max_workers=n_jobs, initializer=_attach,
+                                     initargs=(tmp, shape)) as pool:
+                results = list(pool.map(fit, tasks))
+    return dict(zip(targets, results))
+
+
+# ==========================================
+# SPARSE (NON-ZERO BUDGET) SPECIALISTS
+# ==========================================
+# Under an L1 or elastic-net penalty the number of non-zero weights grows
+# with C. Each target walks SPARSE_C_PATH upwards until a fit goes over
+# `budget` non-zero weights, then bisects (in log C) SPARSE_REFINE times
+# between the last C within budget and that one, keeping the largest fit
+# within budget. saga fits warm-start from the previous C (liblinear has no
+# warm start). If even the smallest C is over budget, its smallest |w| are
+# zeroed down to the budget.
+SPARSE_C_PATH = [0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0]
+SPARSE_REFINE = 3
+
+
+def _fit_budget(task):
+    code, params, budget = task
+    y = (_SHARED["labels"] == code).astype(int)
+    clf = LogisticRegression(**dict(params, warm_start=params.get("solver") != "liblinear"))
+
+    def fit(C):
+        clf.set_params(C=C).fit(_SHARED["X"], y, sample_weight=_SHARED["sample_weight"])
+        return np.count_nonzero(clf.coef_) <= budget, (clf.coef_[0].copy(), float(clf.intercept_[0]))
+
+    best, low, high = None, None, None
+    for C in SPARSE_C_PATH:
+        within, model = fit(C)
+        if within or best is None:
+            best = model
+        if not within:
+            high = C
+            break
+        low = C
+    if low is not None and high is not None:
+        for _ in range(SPARSE_REFINE):
+            C = float(np.sqrt(low * high))
+            within, model = fit(C)
+            if within:
+                best, low = model, C
+            else:
+                high = C
+    coef, intercept = best
+    if np.count_nonzero(coef) > budget:
+        coef[np.argsort(np.abs(coef), kind="stable")[:len(coef) - budget]] = 0.0
+    return coef, intercept
+
+
+def target_c(params, targets):
+    # params["C"]: one C for every target, or a {target: C} dict
+    C = params.get("C", 1.0)
+    if isinstance(C, dict):
+        return [float(C.get(t, 1.0)) for t in targets]
+    return [float(C)] * len(targets)
+
+
+# ==========================================
+# JOINT (ALL-TARGETS) SPECIALIST TRAINING
+# ==========================================
+# The one-vs-rest objectives are independent, so their sum can be minimized
+# as one problem over a (features + 1) x targets matrix. Each L-BFGS step
+# then costs one X @ W and one X.T @ R for all heads together, instead of
+# one traversal of X per head per liblinear iteration.
+
+
+def train_specialists_joint(X, labels, targets, sample_weight, C=1.0, class_weight=None,
+                            max_iter=1000, tol=1e-6, init=None):
+    """All one-vs-rest heads in a single L-BFGS optimization.
+
+    Minimizes, per target, the same objective as liblinear's L2 logistic
+    regression (the intercept is a constant feature and is regularized):
+        0.5 * |w|^2 + 0.5 * b^2 + C * sum_i cost_i * log(1 + exp(-y_i (x_i.w + b)))
+    where cost_i is the sample weight times the class weight. With
+    class_weight='balanced' the class weights are computed from weighted
+    counts, like compute_class_weight(..., sample_weight=...).
+
+    `C` is one value or one per target. `init` optionally maps targets to
+    (coef, intercept) to warm-start from. Returns {target: (coef, intercept)} in `targets` order.
+    """
+    X = sparse.csr_matrix(X, dtype=np.float64)
+    n_rows, n_feats = X.shape
+    sw = np.asarray(sample_weight, dtype=np.float64)
+    labels = np.asarray(labels, dtype=object)
+    Y = np.column_stack([labels == t for t in targets]).astype(np.float64) * 2 - 1
+
+    pos = (Y > 0)
+    cost = np.repeat(sw[:, None], len(targets), axis=1)
+    if class_weight == "balanced":
+        total = sw.sum()
+        w_pos = sw @ pos
+        w_neg = total - w_pos
+        cw_pos = np.where(w_pos > 0, total / (2 * np.maximum(w_pos, 1e-12)), 0.0)
+        cw_neg = np.where(w_neg > 0, total / (2 * np.maximum(w_neg, 1e-12)), 0.0)
+        cost *= np.where(pos, cw_pos, cw_neg)
+    elif class_weight is not None:
+        raise ValueError(f"Unsupported class_weight: {class_weight!r}")
+    cost *= np.asarray(C, dtype=np.float64)
+
+    # Buckets no row touches have a zero optimum; solve over the rest only.
+    active = np.flatnonzero(X.getnnz(axis=0))
+    X = X[:, active]
+    XT = X.T.tocsr()
+
+    def objective(theta):
+        W = theta.reshape(len(active) + 1, len(targets))
+        margin = Y * (X @ W[:-1] + W[-1])
+        # log(1 + exp(-m)) and sigmoid(-m) from a single exp(-|m|)
+        e = np.exp(-np.abs(margin))
+        loss = (cost * (np.maximum(-margin, 0) + np.log1p(e))).sum()
+        R = -cost * Y * np.where(margin > 0, e, 1.0) / (1 + e)
+        grad = np.empty_like(W)
+        grad[:-1] = XT @ R + W[:-1]
+        grad[-1] = R.sum(axis=0) + W[-1]
+        return loss + 0.5 * (theta @ theta), grad.ravel()
+
+    print(f"Training {len(targets)} specialists jointly (L-BFGS)...")
+    theta0 = np.zeros((len(active) + 1, len(targets)))
+    for j, t in enumerate(targets):
+        if init and t in init:
+            coef, intercept = init[t]
+            theta0[:-1, j] = np.asarray(coef)[active]
+            theta0[-1, j] = intercept
+    res = minimize(objective, theta0.ravel(), jac=True, method="L-BFGS-B",
+                   options={"maxiter": max_iter, "ftol": tol, "gtol": tol})
+    if not res.success:
+        print(f"WARNING: joint solver stopped early: {res.message}")
+    W = np.zeros((n_feats + 1, len(targets)))
+    W[np.append(active, n_feats)] = res.x.reshape(len(active) + 1, len(targets))
+    return {t: (W[:-1, j].copy(), float(W[-1, j])) for j, t in enumerate(targets)}
+
+
+# ==========================================
+# INCREMENTAL (WARM-START) RETRAINING
+# ==========================================
+# Every run saves its specialists to CACHE_DIR/models/<name>-<key>, where
+# the key covers everything except SYNTHETICS, next to a digest of each
+# target's synthetic list. An incremental run reloads them and retrains
+# only the targets whose list changed, warm-started from their old weights.
+
+
+def save_specialists(path, models, digests):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=os.path.dirname(path))
+    targets = list(models)
+    np.save(os.path.join(tmp, "coef.npy"), np.array([models[t][0] for t in targets]))
+    np.save(os.path.join(tmp, "intercept.npy"), np.array([models[t][1] for t in targets]))
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump({"targets": targets, "synthetics": digests}, f)
+    # Same key, new synthetics: the entry is replaced rather than kept.
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp, path)
+
+
+def load_specialists(path):
+    # -> ({target: (coef, intercept)}, {target: synthetics digest}) or None
+    if not os.path.isfile(os.path.join(path, "meta.json")):
+        return None
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    coef = np.load(os.path.join(path, "coef.npy"))
+    intercept = np.load(os.path.join(path, "intercept.npy"))
+    models = {t: (coef[i], float(intercept[i])) for i, t in enumerate(meta["targets"])}
+    return models, meta["synthetics"]
+
+
+def update_specialists(name, key, X, labels, targets, sample_weight, params, synthetics,
+                       incremental=False, n_jobs=1, joint=False, budget=None):
+    """train_specialists(), saving the result for later incremental runs.
+
+    With incremental=True and a saved run under the same `key`, only the
+    targets whose synthetics[target] list changed are retrained, with the
+    joint L-BFGS solver (same objective as liblinear) started from the old
+    weights; the others keep their saved weights. Those unchanged heads do
+    not see the edited phrases as new negatives, so run a full build
+    (incremental=False) before shipping. Sparse (budget) runs are always
+    full builds.
+    """
+    if incremental and budget:
+        raise ValueError("Incremental retraining only supports penalty='l2' (no budget)")
+    path = entry_dir("models", name, key)
+    digests = {t: config_digest(synthetics.get(t, [])) for t in targets}
+    previous = load_specialists(path) if incremental else None
+
+    if previous is None:
+        models = train_specialists(X, labels, targets, sample_weight, params,
+                                   n_jobs=n_jobs, joint=joint, budget=budget)
+    else:
+        old_models, old_digests = previous
+        changed = [t for t in targets if t not in old_models or old_digests.get(t) != digests[t]]
+        print(f"[INCREMENTAL] Retraining {changed or 'nothing'}, "
+              f"reusing {len(targets) - len(changed)} saved specialists")
+        models = dict(old_models)
+        if changed:
+            models.update(train_specialists_joint(
+                X, labels, changed, sample_weight, C=target_c(params, changed),
+                class_weight=params.get("class_weight"), init=old_models))
+        models = {t: models[t] for t in targets}
+
+    save_specialists(path, models, digests)
+    prune_stale("models", name, keep=path)
+    return models
+
+
+# ==========================================
+# REGULARIZATION PATH SEARCH
+# ==========================================
+# C is picked per target by CV over a path of values. The training matrix is
+# shared once (memory-mapped, as for the per-target pool) and each fold runs
+# in its own process, walking the path from the smallest C (strongest
+# penalty) up and scoring every head on the held-out rows at each C.
+#
+# Fits use the build's own solver. With joint=True each C is one joint
+# L-BFGS pass over all heads, warm-started from the previous C's solution.
+# liblinear cannot warm-start, but on these matrices a cold liblinear fit
+# is still about 5x faster than a warm-started joint one (AURA at C=1:
+# 1.1s vs 6.5s), so the default path runs it per (target, C).
+#
+# The score is the held-out class-balanced log-loss: the data term of the
+# training objective (sample weights x balanced class weights), without
+# the penalty.
+
+
+def balanced_log_loss(y, score, sample_weight):
+    # mean over the two classes of their weighted mean log-loss
+    loss = np.logaddexp(0, -np.where(y, score, -score))
+    per_class = [np.average(loss[m], weights=sample_weight[m]) for m in (y, ~y) if sample_weight[m].sum() > 0]
+    return float(np.mean(per_class)) if per_class else np.nan
+
+
+def _fit_path(task):
+    fold, codes, c_path, params, joint = task
+    labels = np.asarray(_SHARED["labels"])
+    sw = np.asarray(_SHARED["sample_weight"])
+    test = np.asarray(_SHARED["folds"]) == fold
+    X_train, X_test = _SHARED["X"][~test], _SHARED["X"][test]
+
+    losses = np.full((len(c_path), len(codes)), np.nan)
+    models = None
+    for i, C in enumerate(c_path):
+        if joint:
+            models = train_specialists_joint(X_train, labels[~test], codes, sw[~test], C=C,
+                                             class_weight=params.get("class_weight"), init=models)
+        else:
+            models = {code: _fit_one(X_train, labels[~test] == code, sw[~test], dict(params, C=C))
+                      for code in codes}
+        for j, code in enumerate(codes):
+            coef, intercept = models[code]
+            losses[i, j] = balanced_log_loss(labels[test] == code, X_test @ coef + intercept, sw[test])
+    return losses
+
+
+def search_c(X, labels, targets, sample_weight, params, c_path, n_folds=3, n_jobs=1, joint=False):
+    """Pick C per target by n_folds cross-validation along c_path.
+
+    Returns ({target: best C}, mean held-out loss array of shape
+    (len(c_path), len(targets)), with c_path sorted ascending). Targets
+    with no held-out score keep params["C"].
+    """
+    if joint and params.get("penalty", "l2") != "l2":
+        raise ValueError("Joint training only supports penalty='l2'")
+    c_path = sorted(c_path)
+    fit_params = {k: v for k, v in params.items() if k != "C"}
+    fit_params.setdefault("random_state", 0)
+    codes, uniques = pd.factorize(np.asarray(labels, dtype=object))
+    lookup = {label: i for i, label in enumerate(uniques)}
+    target_codes = [lookup.get(t, -1) for t in targets]
+    weights = np.asarray(sample_weight, dtype=np.float64)
+    folds = np.random.RandomState(0).permutation(len(codes)) % n_folds
+    tasks = [(k, target_codes, c_path, fit_params, joint) for k in range(n_folds)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        shape = _share(tmp, X, codes, weights)
+        np.save(os.path.join(tmp, "folds.npy"), folds)
+        n_jobs = min(n_jobs or 1, n_folds)
+        print(f"Searching C over {c_path} ({n_folds} folds, {n_jobs} processes)...")
+        if n_jobs <= 1:
+            _attach(tmp, shape)
+            results = list(map(_fit_path, tasks))
+            _SHARED.clear()
+        else:
+            with ProcessPoolExecutor(max_workers=n_jobs, initializer=_attach,
+                                     initargs=(tmp, shape)) as pool:
+                results = list(pool.map(_fit_path, tasks))
+
+    losses = np.nanmean(np.array(results), axis=0)
+    default = target_c(params, targets)
+    best = {}
+    for j, t in enumerate(targets):
+        scored = ~np.isnan(losses[:, j])
+        best[t] = c_path[int(np.nanargmin(losses[:, j]))] if scored.any() else default[j]
+    return best, losses
@@ -0,0 +1,124 @@
+import os
+import tempfile
+import time
+
+import numpy as np
+from scipy import sparse
+from sklearn.linear_model import SGDClassifier
+from sklearn.preprocessing import normalize
+
+# ==========================================
+# STREAMING (BOUNDED-MEMORY) SPECIALIST TRAINING
+# ==========================================
+# The in-RAM path loads every corpus, balances it to SAMPLES_PER_CLASS and
+# fits on the whole matrix. This one never holds more than a few chunks:
+#
+#   1. spill: each chunk of (clean_text, label, weight) rows coming from the
+#      creator's chunked loaders is hashed and written to a temporary shard
+#      (CSR counts + target code + weight). Non-target rows are dropped,
+#      like balance_classes does. Only per-target weight totals and, for
+#      tf-idf, per-bucket document frequencies are kept in memory.
+#   2. epochs: the shard order is reshuffled every epoch; SHUFFLE_SHARDS
+#      shards at a time are loaded, their rows permuted, and fed as
+#      BATCH_ROWS minibatches to one SGDClassifier (log loss) per target
+#      through partial_fit.
+#
+# There is no resampling. Every row keeps its weight and each head gets
+# balanced class weights from the spill totals, as class_weight='balanced'
+# would compute them on the whole corpus. Memory is one shuffle window
+# plus the hash_size x targets weights, whatever the corpus size: chunks
+# are cleaned (EngineView.clean_chunk, in the creators) and hashed
+# (EngineView.hash_chunk) with per-chunk token memos, not the process-wide
+# ones that keep every distinct token.
+STREAM_CHUNK_ROWS = 20000
+SHUFFLE_SHARDS = 4
+BATCH_ROWS = 2048
+SGD_PARAMS = dict(loss="log_loss", penalty="l2", alpha=1e-5, average=True)
+
+
+class _Spill:
+    def __init__(self, directory, view, targets, tfidf):
+        self.directory = directory
+        self.view = view
+        self.codes = {t: i for i, t in enumerate(targets)}
+        self.paths = []
+        self.mass = np.zeros(len(targets))  # weight per target
+        self.doc_freq = np.zeros(view.hash_size) if tfidf else None
+        self.n_docs = 0.0
+
+    def add(self, chunk):
+        codes = chunk['label'].astype(object).map(self.codes).fillna(-1).to_numpy(dtype=np.int64)
+        keep = codes >= 0
+        if not keep.any():
+            return
+        weight = (chunk['weight'].to_numpy(dtype=np.float64) if 'weight' in chunk
+                  else np.ones(len(chunk)))[keep]
+        codes = codes[keep]
+        X = sparse.csr_matrix(self.view.hash_chunk(chunk['clean_text'].to_numpy(dtype=object)[keep]))
+        np.add.at(self.mass, codes, weight)
+        if self.doc_freq is not None:
+            self.doc_freq += (X > 0).T.astype(np.float64) @ weight
+            self.n_docs += weight.sum()
+        path = os.path.join(self.directory, f"shard{len(self.paths):05d}.npz")
+        np.savez(path, data=X.data, indices=X.indices, indptr=X.indptr, codes=codes, weight=weight)
+        self.paths.append(path)
+
+    def idf(self):
+        # same smooth idf as weighted_tfidf, over the whole stream
+        return np.log((1 + self.n_docs) / (1 + self.doc_freq)) + 1
+
+
+def _load_shard(path, hash_size):
+    z = np.load(path)
+    X = sparse.csr_matrix((z["data"], z["indices"], z["indptr"]), shape=(len(z["codes"]), hash_size))
+    return X, z["codes"], z["weight"]
+
+
+def _minibatches(paths, hash_size, rng):
+    order = rng.permutation(len(paths))
+    for start in range(0, len(order), SHUFFLE_SHARDS):
+        shards = [_load_shard(paths[i], hash_size) for i in order[start:start + SHUFFLE_SHARDS]]
+        X = sparse.vstack([s[0] for s in shards], format="csr")
+        codes = np.concatenate([s[1] for s in shards])
+        weight = np.concatenate([s[2] for s in shards])
+        perm = rng.permutation(len(codes))
+        for b in range(0, len(perm), BATCH_ROWS):
+            rows = perm[b:b + BATCH_ROWS]
+            yield X[rows], codes[rows], weight[rows]
+
+
+def train_streaming(chunks, targets, view, epochs=5, tfidf=False, params=SGD_PARAMS, random_state=0):
+    """One SGD specialist per target over a stream of row chunks.
+
+    `chunks` yields DataFrames with clean_text and label (and optionally
+    weight, default 1); it is consumed once. With tfidf=True rows are
+    transformed like weighted_tfidf, with the idf of the whole stream.
+    Returns {target: (coef, intercept)} in `targets` order, like
+    train_specialists.
+    """
+    rng = np.random.RandomState(random_state)
+    with tempfile.TemporaryDirectory() as tmp:
+        spill = _Spill(tmp, view, targets, tfidf)
+        start = time.perf_counter()
+        for chunk in chunks:
+            spill.add(chunk)
+        total = spill.mass.sum()
+        print(f"[STREAM] Spilled {len(spill.paths)} shards ({total:.0f} weighted rows) "
+              f"in {time.perf_counter() - start:.1f}s")
+        idf = sparse.diags(spill.idf()) if tfidf else None
+
+        # balanced class weights per head: total / (2 * class total)
+        pos_w = np.where(spill.mass > 0, total / (2 * np.maximum(spill.mass, 1e-12)), 0.0)
+        neg_w = total / (2 * np.maximum(total - spill.mass, 1e-12))
+        heads = [SGDClassifier(**params, random_state=random_state) for _ in targets]
+        for epoch in range(epochs):
+            start = time.perf_counter()
+            for X, codes, weight in _minibatches(spill.paths, view.hash_size, rng):
+                if idf is not None:
+                    X = normalize(X @ idf, norm='l2')
+                for k, clf in enumerate(heads):
+                    y = codes == k
+                    clf.partial_fit(X, y.astype(int), classes=[0, 1],
+                                    sample_weight=weight * np.where(y, pos_w[k], neg_w[k]))
+            print(f"[STREAM] Epoch {epoch + 1}/{epochs} in {time.perf_counter() - start:.1f}s")
+    return {t: (clf.coef_[0].astype(np.float64), float(clf.intercept_[0])) for t, clf in zip(targets, heads)}
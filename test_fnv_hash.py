@@ -0,0 +1,64 @@
+import json
+import re
+import shutil
+import subprocess
+
+import numpy as np
+import pytest
+
+from fnv_hash import FnvBucketCache, fnv1a_32_batch, fnv1a_32_js
+
+RUNTIME = "AURA+v15 (No Weights).js"
+STRINGS = [
+    "", "a", "ab", "abc", "hello", "hello world", "a" * 40,  # mixed lengths, longest last
+    "café", "naïve", "你好",  # BMP, one code unit each
+    "\U0001f600", "x\U0001f600y", "\U0001f600\U0001f622",  # surrogate pairs
+    "\ud800", "a\udfffb",  # lone surrogates (valid in a JS string)
+]
+
+
+def js_fnv1a32(strings):
+    # the runtime's own fnv1a32, run in node
+    src = open(RUNTIME, encoding="utf-8").read()
+    fn = re.search(r"function fnv1a32\(str\) \{.*?return h >>> 0;\n  \}", src, re.S).group(0)
+    script = f"{fn}\nconst xs = JSON.parse(require('fs').readFileSync(0, 'utf8'));\n" \
+             "console.log(JSON.stringify(xs.map(fnv1a32)));"
+    out = subprocess.run(["node", "-e", script], input=json.dumps(strings), capture_output=True,
+                         text=True, check=True).stdout
+    return json.loads(out)
+
+
+def test_batch_matches_scalar():
+    np.testing.assert_array_equal(fnv1a_32_batch(STRINGS), [fnv1a_32_js(s) for s in STRINGS])
+
+
+def test_batch_is_order_independent():
+    # lengths are sorted internally; each hash must land back on its string
+    shuffled = STRINGS[::-1] + STRINGS[3:7]
+    np.testing.assert_array_equal(fnv1a_32_batch(shuffled), [fnv1a_32_js(s) for s in shuffled])
+
+
+def test_known_values():
+    # published FNV-1a 32 vectors
+    assert fnv1a_32_js("") == 0x811C9DC5
+    assert fnv1a_32_js("a") == 0xE40C292C
+    assert fnv1a_32_js("foobar") == 0xBF9CF968
+    assert fnv1a_32_batch([]).dtype == np.uint32
+
+
+def test_surrogate_pair_hashes_two_code_units():
+    assert fnv1a_32_js("\U0001f600") == fnv1a_32_js("😀")
+    assert fnv1a_32_js("\U0001f600") != fnv1a_32_js("\ud83d")
+
+
+def test_bucket_cache_matches_batch():
+    cache = FnvBucketCache()
+    tokens = STRINGS + STRINGS[:5]  # repeats hit the memo
+    np.testing.assert_array_equal(cache.buckets(tokens, 16384), fnv1a_32_batch(tokens) % 16384)
+    np.testing.assert_array_equal(cache.buckets(tokens, 1000), fnv1a_32_batch(tokens) % 1000)
+    assert len(cache) == len(set(tokens))
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node not installed")
+def test_batch_matches_js_runtime():
+    np.testing.assert_array_equal(fnv1a_32_batch(STRINGS), js_fnv1a32(STRINGS))
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from specialist_export import (QUANTIZERS, WEIGHT_FORMATS, c_field, decode_quant, model_c, parse_model, quant_field,
+                               quantize, read_blob, round_trip, weights_field)
+
+SIZE = 1024
+
+
+def int8_weights(seed=0):
+    rng = np.random.RandomState(seed)
+    w = rng.randint(-128, 128, size=SIZE)
+    w[rng.rand(SIZE) < 0.7] = 0  # mostly empty buckets, like a real specialist
+    return w
+
+
+def write_blob(path, models, sep="="):
+    lines = [f"var HASH_SIZE {sep} {SIZE};"] + [f'var {name} = "{s}"' for name, s in models.items()]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+@pytest.mark.parametrize("sep", ["=", ":"])
+@pytest.mark.parametrize("fmt", WEIGHT_FORMATS)
+def test_int8_formats_round_trip(tmp_path, fmt, sep):
+    w = int8_weights()
+    model_str = f"b{sep}-0.25;s{sep}0.0125;{weights_field(w, fmt=fmt, sep=sep)}"
+    assert parse_model(model_str, size=SIZE) == (-0.25, 0.0125, pytest.approx(w))
+    n, sizes = round_trip(write_blob(tmp_path / "blob.js", {"MODEL_A": model_str}), size=SIZE)
+    assert n == 1
+    assert all(sizes.values())
+
+
+@pytest.mark.parametrize("sep", ["=", ":"])
+@pytest.mark.parametrize("method", QUANTIZERS[1:])
+def test_quantized_formats_round_trip(tmp_path, method, sep):
+    w = np.random.RandomState(1).standard_normal(SIZE)
+    w[:4] *= 50  # outliers for "mixed"
+    scale, field = quant_field(w, method, sep=sep)
+    model_str = f"b{sep}0.5;s{sep}{scale};{field}"
+    _, group, mults, codes, outliers = quantize(w, method)
+    expected = codes * np.repeat(mults, group)[:SIZE] if group else codes.copy()
+    for h, v in outliers.items():
+        expected[h] = v
+    bias, s, weights = parse_model(model_str)
+    assert (bias, s) == (0.5, scale)
+    np.testing.assert_array_equal(weights[:SIZE], expected)
+    np.testing.assert_array_equal(decode_quant(field[2:])[:SIZE], expected)
+    n, _ = round_trip(write_blob(tmp_path / "blob.js", {"MODEL_A": model_str}), size=SIZE)
+    assert n == 1
+
+
+def test_round_trip_flags_a_non_canonical_field(tmp_path):
+    model_str = "b=0;s=1;w=" + ",".join(["01"] + ["0"] * (SIZE - 1))
+    with pytest.raises(AssertionError, match="re-export"):
+        round_trip(write_blob(tmp_path / "blob.js", {"MODEL_A": model_str}), size=SIZE)
+
+
+def test_read_blob_skips_empty_models(tmp_path):
+    path = write_blob(tmp_path / "blob.js", {"MODEL_A": "b=0;s=1;w=1,2", "MODEL_B": ""})
+    assert read_blob(path) == {"MODEL_A": "b=0;s=1;w=1,2"}
+
+
+@pytest.mark.parametrize("sep", ["=", ":"])
+def test_c_field_is_recorded_and_skipped(tmp_path, sep):
+    w = int8_weights()
+    model_str = f"b{sep}0.5;s{sep}0.01{c_field(0.3, sep=sep)};{weights_field(w, fmt='sparse', sep=sep)}"
+    assert model_c(model_str) == 0.3
+    assert model_c(f"b{sep}0.5;s{sep}0.01;{weights_field(w, sep=sep)}") is None
+    assert parse_model(model_str, size=SIZE) == (0.5, 0.01, pytest.approx(w))
+    assert round_trip(write_blob(tmp_path / "blob.js", {"MODEL_A": model_str}), size=SIZE)[0] == 1
+
+
+def test_parse_model_rejects_unknown_fields():
+    with pytest.raises(ValueError, match="Unknown model string field"):
+        parse_model("b=0;s=1;x=2;w=1,2")
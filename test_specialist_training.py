@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfTransformer
+
+from specialist_training import balance_classes, collapse_duplicates, train_specialists, weighted_tfidf
+
+TARGETS = ["joy", "anger", "fear"]
+PARAMS = dict(solver='liblinear', C=1.0, class_weight='balanced')
+
+
+def pool():
+    # corpus rows (weight 1, some repeated) and synthetic phrases (weight k)
+    rows = [("joy", f"glad {i % 7}", 1.0) for i in range(40)]
+    rows += [("anger", f"mad {i}", 1.0) for i in range(25)]
+    rows += [("joy", "so happy", 5.0), ("joy", "glad 3", 2.0), ("anger", "furious", 10.0)]
+    rows += [("fear", "scared", 3.0), ("fear", "afraid", 1.0)]
+    return pd.DataFrame(rows, columns=["label", "clean_text", "weight"])
+
+
+def duplicated_pool(df):
+    # the pool before weighting: a row of weight k is k identical copies
+    return df.loc[df.index.repeat(df['weight'].astype(int))].assign(weight=1.0)
+
+
+def test_balance_matches_resampling_the_duplicated_pool_in_expectation():
+    df, n_samples = pool(), 60
+    expected = {}
+    for target, df_class in duplicated_pool(df).groupby("label"):
+        # resample(n_samples) of the copies: each copy is drawn n_samples / len times on average
+        counts = df_class.groupby("clean_text").size()
+        expected.update({(target, text): n * n_samples / len(df_class) for text, n in counts.items()})
+    runs = [balance_classes(df, TARGETS, n_samples, random_state=seed) for seed in range(400)]
+    for out in runs:
+        assert out.groupby("label")["weight"].sum().to_dict() == pytest.approx(
+            {t: n_samples for t in TARGETS}, abs=1)
+    mean = pd.concat(runs).groupby(["label", "clean_text"])["weight"].sum() / len(runs)
+    assert set(mean.index) == set(expected)
+    for key, weight in expected.items():
+        assert mean[key] == pytest.approx(weight, rel=0.15), key
+
+
+def test_weighted_tfidf_counts_a_weighted_row_as_copies():
+    rng = np.random.RandomState(0)
+    X = sparse.random(30, 50, density=0.1, random_state=rng, format="csr") * 5
+    w = rng.randint(1, 5, size=30).astype(np.float64)
+    X_tfidf, idf = weighted_tfidf(X, w)
+    dup = TfidfTransformer(norm='l2', use_idf=True, smooth_idf=True).fit(X[np.repeat(np.arange(30), w.astype(int))])
+    np.testing.assert_allclose(idf, dup.idf_)
+    np.testing.assert_allclose(X_tfidf.toarray(), dup.transform(X).toarray())
+
+
+def test_collapse_duplicates_keeps_the_weight_of_each_row():
+    df = pool()
+    out = collapse_duplicates(df)
+    assert not out.duplicated(["label", "clean_text"]).any()
+    pd.testing.assert_series_equal(out.groupby(["label", "clean_text"])["weight"].sum(),
+                                   df.groupby(["label", "clean_text"])["weight"].sum())
+
+
+def test_balance_collapses_draws_into_multiplicities():
+    df, n_samples = pool(), 60
+    out = balance_classes(df, TARGETS, n_samples, random_state=7)
+    assert not out.duplicated(["label", "clean_text"]).any()
+    # the same draw as resample(): corpus rows of each class, with replacement, fixed seed
+    for target in TARGETS:
+        df_class = df[df['label'] == target]
+        drawn = df_class[df_class['weight'] == 1]
+        mass = df_class['weight'].sum()
+        n_draw = int(round(n_samples * len(drawn) / mass))
+        idx = np.random.RandomState(7).randint(0, len(drawn), size=n_draw) if n_draw else []
+        kept = df_class[df_class['weight'] != 1].assign(weight=lambda d: n_samples * d['weight'] / mass)
+        ref = pd.concat([drawn.iloc[idx].assign(weight=1.0), kept])
+        got = out[out['label'] == target]
+        pd.testing.assert_series_equal(got.groupby("clean_text")["weight"].sum(),
+                                       ref.groupby("clean_text")["weight"].sum())
+
+
+def test_parallel_training_matches_serial():
+    rng = np.random.RandomState(0)
+    X = sparse.random(300, 200, density=0.05, random_state=rng, format="csr")
+    labels = rng.choice(TARGETS, size=300)
+    sample_weight = rng.choice([1.0, 1.0, 1.0, 4.0], size=300)
+    serial = train_specialists(X, labels, TARGETS, sample_weight, PARAMS, n_jobs=1)
+    parallel = train_specialists(X, labels, TARGETS, sample_weight, PARAMS, n_jobs=2)
+    assert list(serial) == list(parallel) == TARGETS
+    for target in TARGETS:
+        np.testing.assert_array_equal(serial[target][0], parallel[target][0])
+        assert serial[target][1] == parallel[target][1]
@@ -0,0 +1,79 @@
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import emotion_creator2
+import eros_creator
+import intent_creator
+import text_clean
+from text_clean import TextCleaner
+
+CREATORS = [emotion_creator2, eros_creator, intent_creator]  # one stem variant each
+
+# JS \s whitespace (\ufeff is not Python whitespace) plus Python-only \x1c, \x85
+WHITESPACE = "\t\n\v\f\r \xa0\u1680\u2000\u2009\u200a\u2028\u2029\u202f\u205f\u3000\ufeff\x1c\x85"
+TEXTS = [
+    "", " ", "I can't BELIEVE it's happening!!! :-(",
+    "Don't... stop; (please) -- it's FINE, really.",
+    "an, the! is? to. of it",  # stop words, some with punctuation
+    "ab cd e fg hij klmn ok no",  # len <= 2 dropped
+    "happiness carelessly excitedly boxes studies stressed kissing",
+    "caf\xe9 na\xefve r\xe9sum\xe9 Stra\xdfe \u0130stanbul \ufb01nally",  # non-ASCII letters
+    "word\xa0word\u2003word\u3000word\ufeffword\u200bword\x1cword",
+    "emoji \U0001f600 happy\U0001f600days \U0001f600\U0001f622",
+    "123 4567 a1b2c3 _under_score_",
+    f"tab{WHITESPACE}separated{WHITESPACE}",
+    None, np.nan, pd.NA, 3.5,
+]
+
+
+def original_clean(text, creator):
+    # the creators' advanced_clean() before TextCleaner
+    text = str(text).lower()
+    text = re.sub(r'[^a-z0-9\s]', '', text)
+    tokens = text.split()
+    tokens = [creator.stem(t) for t in tokens if t not in creator.STOP_WORDS and len(t) > 2]
+    return " ".join(tokens)
+
+
+def random_texts(n=500, seed=0):
+    rng = np.random.RandomState(seed)
+    alphabet = list("abcdeinorstly0123 ,.!'?-_ABCIS") + list(WHITESPACE) + ["\xe9", "\U0001f600", "\xdf"]
+    words = ["the", "is", "it", "to", "of", "and", "running", "happiness", "studies", "kissed", "ok"]
+    out = []
+    for _ in range(n):
+        if rng.rand() < 0.5:
+            out.append("".join(rng.choice(alphabet, size=rng.randint(0, 40))))
+        else:
+            out.append(" ".join(rng.choice(words, size=rng.randint(0, 8))))
+    return out
+
+
+@pytest.mark.parametrize("creator", CREATORS, ids=lambda m: m.__name__)
+def test_clean_matches_original(creator):
+    cleaner = TextCleaner(creator.stem, creator.STOP_WORDS)
+    for text in TEXTS + random_texts():
+        assert cleaner.clean(text) == original_clean(text, creator), repr(text)
+
+
+@pytest.mark.parametrize("creator", CREATORS, ids=lambda m: m.__name__)
+def test_clean_many_matches_original(creator):
+    texts = TEXTS + random_texts(seed=1)
+    texts = texts + texts[::3] + [texts[4]] * 5  # repeated rows
+    cleaned = TextCleaner(creator.stem, creator.STOP_WORDS).clean_many(texts)
+    assert cleaned.dtype == object
+    assert list(cleaned) == [original_clean(t, creator) for t in texts]
+    assert len(TextCleaner(creator.stem, creator.STOP_WORDS).clean_many([])) == 0
+
+
+def test_fresh_cleans_the_same_with_private_memos():
+    cleaner = TextCleaner(eros_creator.stem, eros_creator.STOP_WORDS)
+    texts = TEXTS + ["fresh-only-chunk-xyzzy"]
+    shared = dict(text_clean._STRIPPED)
+    fresh = cleaner.fresh()
+    assert list(fresh.clean_many(texts)) == [original_clean(t, eros_creator) for t in texts]
+    assert "fresh-only-chunk-xyzzy" in fresh.tokens.stripped
+    assert text_clean._STRIPPED == shared  # the process-wide table is untouched
+    assert not cleaner.tokens  # and so is the parent's token memo
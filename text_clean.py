@@ -0,0 +1,83 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# MEMOIZED TEXT CLEANING
+# ==========================================
+# Same output as the creators' advanced_clean():
+#   lower -> drop [^a-z0-9\s] -> split -> drop stop words / len <= 2 -> stem
+# The regex only deletes non-whitespace characters, so it can be applied to
+# each whitespace-separated chunk instead of the whole row. Every distinct
+# chunk then goes through the regex, the stop-word filter and `stem` exactly
+# once; after that it is a dict lookup.
+#
+# Lower-casing, splitting and the regex do not depend on the engine, so the
+# chunk -> stripped token table is shared by every TextCleaner in the
+# process; only the stop-word filter and `stem` are per cleaner. Both tables
+# grow with the vocabulary: a streamed corpus cleans each chunk with a
+# TextCleaner.fresh() copy instead, whose tables are dropped with it.
+NON_ALNUM = re.compile(r'[^a-z0-9\s]')
+
+_STRIPPED = {}
+
+
+def strip_chunk(chunk, stripped=None):
+    stripped = _STRIPPED if stripped is None else stripped
+    token = stripped.get(chunk)
+    if token is None:
+        token = stripped[chunk] = NON_ALNUM.sub('', chunk)
+    return token
+
+
+class _TokenCache(dict):
+    # lower-cased chunk -> cleaned, stemmed token, or None when dropped
+    def __init__(self, stem, stop_words, min_len, stripped=None):
+        super().__init__()
+        self.stem = stem
+        self.stop_words = stop_words
+        self.min_len = min_len
+        self.stripped = stripped
+
+    def __missing__(self, chunk):
+        token = strip_chunk(chunk, self.stripped)
+        if not token or token in self.stop_words or len(token) < self.min_len:
+            out = None
+        else:
+            out = self.stem(token)
+        self[chunk] = out
+        return out
+
+
+class TextCleaner:
+    """advanced_clean() for one (stem, STOP_WORDS) pair, memoized per token.
+
+    The stem variants differ between the creators, so each builds its own
+    TextCleaner from its stem and STOP_WORDS.
+    """
+
+    def __init__(self, stem, stop_words, min_len=3, stripped=None):
+        # stripped: chunk -> stripped token table (None: the process-wide one)
+        self.tokens = _TokenCache(stem, stop_words, min_len, stripped)
+
+    def fresh(self):
+        # same cleaning, with private empty memos (nothing shared with the process)
+        t = self.tokens
+        return TextCleaner(t.stem, t.stop_words, t.min_len, stripped={})
+
+    def clean_tokens(self, text):
+        get = self.tokens.__getitem__
+        return [t for t in map(get, str(text).lower().split()) if t is not None]
+
+    def clean(self, text):
+        return " ".join(self.clean_tokens(text))
+
+    def clean_many(self, texts):
+        # Column version of clean(): -> object array of cleaned strings.
+        # Repeated rows (one per label in multi-label corpora) are cleaned once.
+        # Rows are keyed by str(row), what clean() sees: factorize alone would
+        # merge None and NaN into one missing value ("none" vs "nan").
+        codes, uniques = pd.factorize(np.array([str(t) for t in texts], dtype=object))
+        cleaned = np.array([self.clean(t) for t in uniques], dtype=object)
+        return cleaned[codes] if len(codes) else cleaned[:0]
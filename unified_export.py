@@ -0,0 +1,167 @@
+import base64
+import re
+import sys
+
+import numpy as np
+
+from fnv_hash import FnvBucketCache
+from specialist_export import parse_model, read_blob
+
+# ==========================================
+# UNIFIED CROSS-ENGINE WEIGHT MATRIX
+# ==========================================
+# AURA, EROS and EIDOS tokenize a message the same way at runtime (same
+# _normalizeText, STOP_STR, stem and bigrams), so every specialist sees the
+# same token list. Instead of one MODEL_* string per specialist, the unified
+# blob stores one bucket-major int8 matrix: row h holds the weight of bucket
+# h for every head, so a token costs one fnv1a32 plus one contiguous read of
+# n_heads bytes, whatever the number of specialists.
+#
+#   var UNIFIED_HASH_SIZE = 16384;
+#   var UNIFIED_HEADS = "AURA.MODEL_ANGER,...,EIDOS.MODEL_NARRATIVE";
+#   var UNIFIED_BIAS = "b0,b1,...";      (one per head, in UNIFIED_HEADS order)
+#   var UNIFIED_SCALE = "s0,s1,...";
+#   var UNIFIED_WEIGHTS = "BASE64";      (HASH_SIZE x n_heads int8, row-major)
+#
+# Heads with an empty model string (not trained) get bias -999 and scale 0,
+# which is exactly what solveEmotion / solveEros / solveIntent return for
+# them (-999, never fires).
+ENGINE_BLOBS = [
+    ("AURA", "specialist_blob_synth.js"),
+    ("EROS", "EROS_Sister_Script.js"),
+    ("EIDOS", "EIDOS_Sister_Script.js"),
+]
+UNIFIED_BLOB = "unified_blob.js"
+EMPTY_BIAS = -999.0
+
+
+class UnifiedModel:
+    def __init__(self, heads, bias, scale, weights):
+        self.heads = list(heads)
+        self.bias = np.asarray(bias, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.weights = np.ascontiguousarray(weights, dtype=np.int8)  # (hash_size, n_heads)
+        self.hash_size = self.weights.shape[0]
+
+
+def build_unified(engine_blobs=ENGINE_BLOBS):
+    # Every MODEL_* of every engine blob -> one UnifiedModel (blob order)
+    heads, bias, scale, columns = [], [], [], []
+    hash_size = None
+    for engine, path in engine_blobs:
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        trained = read_blob(path)
+        size = re.search(r'var HASH_SIZE = (\d+)', text)
+        size = int(size.group(1)) if size else 16384  # only needed for sparse models
+        for name in _model_names(text):
+            heads.append(f"{engine}.{name}")
+            if name not in trained:
+                bias.append(EMPTY_BIAS)
+                scale.append(0.0)
+                columns.append(None)
+                continue
+            b, s, w = parse_model(trained[name], size=size)
+            if hash_size is None:
+                hash_size = len(w)
+            elif len(w) != hash_size:
+                raise ValueError(f"{path}: {name} has {len(w)} buckets, expected {hash_size}")
+            if w.size and (w.min() < -128 or w.max() > 127):
+                raise ValueError(f"{path}: {name} weights do not fit in int8 "
+                                 f"(build with QUANTIZER 'int8' or 'int4')")
+            bias.append(b)
+            scale.append(s)
+            columns.append(w)
+    hash_size = hash_size or 16384
+    weights = np.zeros((hash_size, len(heads)), dtype=np.int8)
+    for k, w in enumerate(columns):
+        if w is not None:
+            weights[:, k] = w
+    return UnifiedModel(heads, bias, scale, weights)
+
+
+def _model_names(text):
+    # MODEL_* names in file order, trained or not
+    return re.findall(r'var (MODEL_\w+) = "', text)
+
+
+def write_unified(model, path=UNIFIED_BLOB):
+    packed = base64.b64encode(model.weights.tobytes()).decode("ascii")
+    js_output = "// UNIFIED SPECIALIST MATRIX (AURA + EROS + EIDOS)\n"
+    js_output += "// One bucket-major int8 row per hash bucket; see unified_export.py\n\n"
+    js_output += f"var UNIFIED_HASH_SIZE = {model.hash_size};\n"
+    js_output += f"var UNIFIED_HEADS = \"{','.join(model.heads)}\";\n"
+    js_output += f"var UNIFIED_BIAS = \"{','.join(map(repr, model.bias.tolist()))}\";\n"
+    js_output += f"var UNIFIED_SCALE = \"{','.join(map(repr, model.scale.tolist()))}\";\n"
+    js_output += f"var UNIFIED_WEIGHTS = \"{packed}\";\n"
+    with open(path, "w") as f:
+        f.write(js_output)
+
+
+def read_unified(path=UNIFIED_BLOB):
+    fields = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("var UNIFIED_"):
+                key, value = line[len("var UNIFIED_"):].rstrip().rstrip(";").split(" = ", 1)
+                fields[key] = value.strip('"')
+    heads = fields["HEADS"].split(",")
+    bias = np.array(fields["BIAS"].split(","), dtype=np.float64)
+    scale = np.array(fields["SCALE"].split(","), dtype=np.float64)
+    flat = np.frombuffer(base64.b64decode(fields["WEIGHTS"]), dtype=np.int8)
+    return UnifiedModel(heads, bias, scale, flat.reshape(int(fields["HASH_SIZE"]), len(heads)))
+
+
+# ==========================================
+# REFERENCE SCORER
+# ==========================================
+def score_tokens(model, tokens, cache=None):
+    """Scores of every head for one runtime token list (allTokens).
+
+    Same arithmetic as the runtime solvers, head by head: start from the
+    bias and add w * scale once per token, in token order, in float64. So
+    the result is bit-for-bit what the per-model strings give.
+    """
+    cache = FnvBucketCache() if cache is None else cache
+    score = model.bias.copy()
+    for h in cache.buckets(list(tokens), model.hash_size).tolist():
+        score += model.weights[h] * model.scale
+    return score
+
+
+def score_many(model, token_lists, cache=None):
+    # -> (n_messages, n_heads) score matrix
+    cache = FnvBucketCache() if cache is None else cache
+    out = np.empty((len(token_lists), len(model.heads)), dtype=np.float64)
+    for i, tokens in enumerate(token_lists):
+        out[i] = score_tokens(model, tokens, cache=cache)
+    return out
+
+
+def _check_against_blobs(model, engine_blobs=ENGINE_BLOBS, token_lists=()):
+    # Unified scores == per-model scores (same accumulation) for every head
+    cache = FnvBucketCache()
+    scores = score_many(model, token_lists, cache=cache)
+    for engine, path in engine_blobs:
+        for name, model_str in read_blob(path).items():
+            k = model.heads.index(f"{engine}.{name}")
+            b, s, w = parse_model(model_str)
+            for i, tokens in enumerate(token_lists):
+                expected = b
+                for h in cache.buckets(list(tokens), len(w)).tolist():
+                    expected += int(w[h]) * s
+                if expected != scores[i, k]:
+                    raise AssertionError(f"{engine}.{name}: unified score differs on {tokens!r}")
+
+
+if __name__ == "__main__":
+    # python unified_export.py [out.js]: build, write, re-read and check
+    path = sys.argv[1] if len(sys.argv) > 1 else UNIFIED_BLOB
+    model = build_unified()
+    write_unified(model, path)
+    model = read_unified(path)
+    words = "love hate happi sad kiss angri fear hello tell pleas promis sorri run walk fine okay mayb never alway".split()
+    samples = [[words[(i * 7 + k * 5) % len(words)] for k in range(1 + i % 9)] for i in range(200)]
+    samples = [t + [f"{a} {b}" for a, b in zip(t, t[1:])] for t in samples]
+    _check_against_blobs(model, token_lists=samples)
+    print(f"{path}: {len(model.heads)} heads x {model.hash_size} buckets OK")